@@ -0,0 +1,262 @@
+"""
+Module for benchmarking the N-Dimensional Wireframe Renderer.
+
+Runs one reproducible scenario per pipeline stage: preset generation, preset
+cache reads, rotation, projection, redrawing, and saving and loading large
+files. Each scenario reports its timings, edges per second and peak memory as
+JSON, so results can be compared across versions. With a baseline file, the run fails when any stage
+is slower than the baseline by more than the allowed tolerance.
+
+Example:
+    python benchmark.py --output after.json --baseline before.json --tolerance 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pygame
+import cache
+import data
+import events
+import panel
+import parallel
+import presets
+import render
+import utils
+
+def parse_args(argv=None):
+    """Parse the command line options for a benchmark run."""
+    parser = argparse.ArgumentParser(description="Benchmark the stages of the wireframe renderer.")
+    parser.add_argument("--output", help="file to write the JSON results to (default: print them)")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline (default: 0.2 = 20%%)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs per scenario (default: 5)")
+    parser.add_argument("--min-dimensions", type=int, default=2, help="lowest preset dimension (default: 2)")
+    parser.add_argument("--max-dimensions", type=int, default=14, help="highest preset dimension (default: 14)")
+    parser.add_argument("--dimensions", type=int, default=10, help="hypercube dimension for the per-frame and file scenarios (default: 10)")
+    parser.add_argument("--frames", type=int, default=20, help="frames per run for the per-frame scenarios (default: 20)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes for the parallel projection scenario (default: all cores)")
+    parser.add_argument("--stages", nargs="+", choices=["presets","cache","rotate","project","redraw","files"],
+                        default=["presets","cache","rotate","project","redraw","files"], help="stages to run (default: all)")
+    return parser.parse_args(argv)
+
+def measure(name, function, repeat, edges=0, setup=None):
+    """Time a scenario over several runs and return its timings, throughput and peak memory."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        # Scenario output (such as load/save messages) is not part of the results
+        with contextlib.redirect_stdout(io.StringIO()):
+            function()
+        times.append(time.perf_counter() - start)
+    # Peak memory is measured in a separate run since tracing allocations slows down the timed runs
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    median = statistics.median(times)
+    result = {"name": name,
+              "runs": repeat,
+              "median_seconds": median,
+              "min_seconds": min(times),
+              "max_seconds": max(times),
+              "edges": edges,
+              "edges_per_second": edges / median if median > 0 else None,
+              "peak_memory_bytes": peak_memory}
+    print("  " + name.ljust(28) + str(round(median * 1000, 3)).rjust(12) + " ms" + str(peak_memory // 1024).rjust(12) + " KiB", file=sys.stderr)
+    return result
+
+def load_hypercube(dimensions):
+    """Replace the current wireframe with a hypercube of the given dimensions."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        panel.set_dimensions(dimensions)
+        presets.hypercube(dimensions)
+
+def bench_presets(args):
+    """Benchmark hypercube and hyperpyramid generation for every dimension in the range."""
+    # Generation is measured without the preset cache; the cache has its own stage
+    cache.geometry.enabled = False
+    results = []
+    for dimensions in range(args.min_dimensions, args.max_dimensions + 1):
+        for name, preset in (("hypercube", presets.hypercube), ("hyperpyramid", presets.hyperpyramid)):
+            if name == "hyperpyramid" and dimensions == 2:
+                continue
+            setup = lambda: panel.set_dimensions(dimensions)
+            result = measure("presets." + name + "." + str(dimensions) + "d", lambda: preset(dimensions), args.repeat, setup=setup)
+            result["edges"] = len(data.wireframe.edges)
+            result["edges_per_second"] = result["edges"] / result["median_seconds"]
+            results.append(result)
+    cache.geometry.enabled = True
+    return results
+
+def bench_cache(args):
+    """Benchmark loading the highest-dimensional hypercube from the disk and memory tiers of the preset cache."""
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        cache.geometry = cache.GeometryCache(folder)
+        load_hypercube(args.max_dimensions)
+        edges = len(data.wireframe.edges)
+        name = "cache.hypercube." + str(args.max_dimensions) + "d"
+
+        def setup():
+            panel.set_dimensions(args.max_dimensions)
+            cache.geometry.memory.clear()
+            cache.geometry.memory_bytes = 0
+        results.append(measure(name + ".disk", lambda: presets.hypercube(args.max_dimensions), args.repeat, edges, setup))
+        setup = lambda: panel.set_dimensions(args.max_dimensions)
+        results.append(measure(name + ".memory", lambda: presets.hypercube(args.max_dimensions), args.repeat, edges, setup))
+    cache.geometry = cache.GeometryCache()
+    return results
+
+def bench_rotate(args):
+    """Benchmark rotating the hypercube and applying the orientation to every vertex."""
+    load_hypercube(args.dimensions)
+    edges = len(data.wireframe.edges) * args.frames
+
+    def run():
+        for _ in range(args.frames):
+            events.rotate("right", 1 / 30)
+            data.rotation.transform(data.wireframe.vertices)
+    return [measure("events.rotate." + str(args.dimensions) + "d", run, args.repeat, edges)]
+
+def bench_project(args):
+    """Benchmark projecting the rotated hypercube to screen segments."""
+    load_hypercube(args.dimensions)
+    vertices = data.rotation.transform(data.wireframe.vertices)
+    edges = len(data.wireframe.edges) * args.frames
+
+    def run():
+        for _ in range(args.frames):
+            utils.project_edges(vertices, data.wireframe.edges)
+    results = [measure("utils.project_edges." + str(args.dimensions) + "d", run, args.repeat, edges)]
+    # The parallel scenario transforms as well, since the workers do both in one pass
+    parallel.pool.workers = args.workers
+    parallel.pool.threshold = 0
+
+    def run_parallel():
+        for _ in range(args.frames):
+            vertices, projected = parallel.pool.transform_project(data.wireframe.vertices)
+            utils.project_edges(vertices, data.wireframe.edges, projected)
+    results.append(measure("parallel.project_edges." + str(args.dimensions) + "d." + str(args.workers) + "w", run_parallel, args.repeat, edges))
+    parallel.pool.shutdown()
+    parallel.pool = parallel.ProjectionPool()
+    return results
+
+def bench_redraw(args):
+    """Benchmark full redraws of the hypercube into the offscreen surface."""
+    load_hypercube(args.dimensions)
+    edges = len(data.wireframe.edges) * args.frames
+
+    def run():
+        for _ in range(args.frames):
+            # Each frame rotates, as when animating, so the cached projection can't be reused
+            data.rotation.rotate(data.rotation.theta, data.rotation.plane, data.rotation.center)
+            render.redraw()
+    results = [measure("render.redraw." + str(args.dimensions) + "d", run, args.repeat, edges)]
+
+    def run_cached():
+        for _ in range(args.frames):
+            render.redraw()
+    results.append(measure("render.redraw.cached." + str(args.dimensions) + "d", run_cached, args.repeat, edges))
+    # Every backend draws the same cached segments, so their timings compare the drawing alone
+    segments = render.cache.segments
+    for backend in render.backends:
+        def run_backend():
+            for _ in range(args.frames):
+                render.backends[backend](segments, data.display.screen)
+        results.append(measure("render.draw." + backend + "." + str(args.dimensions) + "d", run_backend, args.repeat, len(segments) * args.frames))
+    return results
+
+def bench_files(args):
+    """Benchmark saving and loading the hypercube as large text and binary wireframe files."""
+    load_hypercube(args.dimensions)
+    edges = len(data.wireframe.edges)
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        file_name = os.path.join(folder, "benchmark.txt")
+        results.append(measure("panel.save_file." + str(args.dimensions) + "d", lambda: panel.save_file(file_name), args.repeat, edges))
+        results[-1]["file_bytes"] = os.path.getsize(file_name)
+        setup = lambda: data.wireframe.clear(args.dimensions)
+        results.append(measure("panel.load_file." + str(args.dimensions) + "d", lambda: panel.load_file(file_name), args.repeat, edges, setup))
+        binary_name = os.path.join(folder, "benchmark.wfb")
+        results.append(measure("panel.save_file.binary." + str(args.dimensions) + "d", lambda: panel.save_file(binary_name), args.repeat, edges))
+        results[-1]["file_bytes"] = os.path.getsize(binary_name)
+        results.append(measure("panel.load_file.binary." + str(args.dimensions) + "d", lambda: panel.load_file(binary_name), args.repeat, edges, setup))
+    return results
+
+def compare(results, baseline, tolerance):
+    """Return the stages that are slower than the baseline by more than the tolerance."""
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        if result["name"] not in previous:
+            continue
+        before = previous[result["name"]]["median_seconds"]
+        if before > 0 and result["median_seconds"] > before * (1 + tolerance):
+            regressions.append({"name": result["name"],
+                                "baseline_seconds": before,
+                                "median_seconds": result["median_seconds"],
+                                "slowdown": result["median_seconds"] / before - 1})
+    return regressions
+
+def main(argv=None):
+    """Run the benchmark scenarios and return a process exit code."""
+    args = parse_args(argv)
+    data.states.headless = True
+    data.display.initialize_headless()
+    stages = {"presets": bench_presets,
+              "cache": bench_cache,
+              "rotate": bench_rotate,
+              "project": bench_project,
+              "redraw": bench_redraw,
+              "files": bench_files}
+    results = []
+    for stage in args.stages:
+        print("[INFO] Running stage '" + stage + "'.", file=sys.stderr)
+        results += stages[stage](args)
+    report = {"environment": {"python": platform.python_version(),
+                              "numpy": np.__version__,
+                              "pygame": pygame.version.ver,
+                              "platform": platform.platform(),
+                              "processor": platform.processor()},
+              "settings": {"repeat": args.repeat,
+                           "dimensions": args.dimensions,
+                           "frames": args.frames,
+                           "min_dimensions": args.min_dimensions,
+                           "max_dimensions": args.max_dimensions},
+              "results": results}
+    exit_code = 0
+    if args.baseline is not None:
+        with open(args.baseline, "r") as file_pointer:
+            report["regressions"] = compare(results, json.load(file_pointer), args.tolerance)
+        for regression in report["regressions"]:
+            print("[ERROR] " + regression["name"] + " is " + str(round(regression["slowdown"] * 100, 1)) + "% slower than the baseline.", file=sys.stderr)
+        if report["regressions"]:
+            exit_code = 1
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w") as file_pointer:
+            json.dump(report, file_pointer, indent=2)
+        print("[SUCCESS] Benchmark results saved to file {" + args.output + "}.", file=sys.stderr)
+    return exit_code
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    finally:
+        pygame.quit()
@@ -0,0 +1,73 @@
+"""
+Module for reading and writing binary wireframe files in the N-Dimensional Wireframe Renderer.
+
+A binary wireframe (.wfb) file starts with a 32-byte header holding the dimension,
+vertex count and edge count, followed by the packed little-endian float64 vertex
+array and the int32 (or int64) edge index array. Loading memory-maps both arrays
+without copying them, and saving writes each array in one bulk write to a new file
+that replaces the old one once it is complete.
+"""
+
+import os
+import struct
+import numpy as np
+
+MAGIC = b"NDWF"
+VERSION = 1
+# Magic, version, flags, dimensions, vertex count, edge count, reserved
+HEADER = struct.Struct("<4sHHIQQI")
+WIDE_EDGES = 1
+
+def write_shape(file_name, vertices, edges):
+    """Write a (V x N) vertex array and an (E x 2) edge index array to a binary wireframe file."""
+    vertices = np.ascontiguousarray(vertices, dtype="<f8")
+    # Edge indices only need 64 bits for meshes with more than 2^31 vertices
+    flags = WIDE_EDGES if len(vertices) >= 2 ** 31 else 0
+    edges = np.ascontiguousarray(edges, dtype="<i8" if flags & WIDE_EDGES else "<i4")
+    # The arrays may be memory-mapped from the file being overwritten, which must not be truncated while they are read
+    temporary_name = file_name + ".tmp"
+    try:
+        with open(temporary_name, "wb") as file_pointer:
+            file_pointer.write(HEADER.pack(MAGIC, VERSION, flags, vertices.shape[1], len(vertices), len(edges), 0))
+            file_pointer.write(memoryview(vertices).cast("B"))
+            file_pointer.write(memoryview(edges).cast("B"))
+        os.replace(temporary_name, file_name)
+    except OSError:
+        if os.path.exists(temporary_name):
+            os.remove(temporary_name)
+        raise
+
+def read_header(file_name):
+    """Return the (dimensions, vertex count, edge count, flags) of a binary wireframe file, or None if it isn't one."""
+    with open(file_name, "rb") as file_pointer:
+        header = file_pointer.read(HEADER.size)
+    if len(header) != HEADER.size:
+        return None
+    magic, version, flags, dimensions, vertex_count, edge_count, _ = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return dimensions, vertex_count, edge_count, flags
+
+def read_shape(file_name):
+    """Memory-map the vertex and edge arrays of a binary wireframe file, or return None if the file is invalid."""
+    header = read_header(file_name)
+    if header is None:
+        return None
+    dimensions, vertex_count, edge_count, flags = header
+    edge_type = np.dtype("<i8" if flags & WIDE_EDGES else "<i4")
+    vertex_bytes = vertex_count * dimensions * 8
+    expected_size = HEADER.size + vertex_bytes + edge_count * 2 * edge_type.itemsize
+    with open(file_name, "rb") as file_pointer:
+        file_pointer.seek(0, 2)
+        if file_pointer.tell() != expected_size:
+            return None
+    vertices = np.empty((0, dimensions))
+    edges = np.empty((0, 2), dtype=edge_type)
+    # np.memmap can't map zero bytes, so empty arrays are created directly
+    if vertex_count > 0:
+        vertices = np.memmap(file_name, dtype="<f8", mode="r", offset=HEADER.size, shape=(vertex_count, dimensions))
+    if edge_count > 0:
+        edges = np.memmap(file_name, dtype=edge_type, mode="r", offset=HEADER.size + vertex_bytes, shape=(edge_count, 2))
+    if len(edges) > 0 and (edges.min() < 0 or edges.max() >= vertex_count):
+        return None
+    return vertices, edges
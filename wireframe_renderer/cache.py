@@ -0,0 +1,153 @@
+"""
+Module for caching generated preset geometry in the N-Dimensional Wireframe Renderer.
+
+Preset meshes are keyed by preset name, dimension and side length. They are kept in
+an in-memory LRU tier and in an on-disk tier of memory-mapped binary wireframe (.wfb)
+files, so loading the same high-dimensional preset again is a read instead of a
+rebuild. Both tiers are bounded in size, evicting the least recently used entries first.
+The file path of the display font is cached alongside, so startup skips the system font scan.
+"""
+
+import os
+import json
+from collections import OrderedDict
+import binary
+
+def base_folder():
+    """Return the program's cache folder, following the XDG cache directory convention."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "nd_wireframe_renderer")
+
+def default_folder():
+    """Return the folder for on-disk preset cache files."""
+    return os.path.join(base_folder(), "presets")
+
+def font_file(name, find):
+    """Return the file of a system font, looking it up with find(name) only if no cached path still exists ('' for the default font)."""
+    file_name = os.path.join(base_folder(), "fonts.json")
+    try:
+        with open(file_name, "r") as file_pointer:
+            fonts = json.load(file_pointer)
+    except (OSError, ValueError):
+        fonts = {}
+    path = fonts.get(name)
+    if path and os.path.exists(path):
+        return path
+    # Only found fonts are cached, so a font installed later is picked up on the next launch
+    path = find(name)
+    if not path:
+        return ""
+    fonts[name] = path
+    try:
+        os.makedirs(base_folder(), exist_ok=True)
+        with open(file_name, "w") as file_pointer:
+            json.dump(fonts, file_pointer)
+    except OSError as error:
+        print("[NOTICE] Font path could not be cached on disk: " + str(error))
+    return path
+
+class GeometryCache:
+    """Two-tier (memory and disk) LRU cache of preset vertex and edge arrays."""
+    def __init__(self, folder=None, memory_limit=256 * 1024 ** 2, disk_limit=1024 ** 3):
+        self.enabled = True
+        self.folder = folder or default_folder()
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def file_name(self, key):
+        """Return the on-disk file of a cache key."""
+        name, dimensions, side = key
+        return os.path.join(self.folder, name + "_" + str(dimensions) + "d_" + str(side) + ".wfb")
+
+    def get(self, name, dimensions, side, build):
+        """Return the (vertices, edges) arrays of a preset, building and caching them with build(dimensions, side) on a miss."""
+        if not self.enabled:
+            return build(dimensions, side)
+        key = (name, dimensions, float(side))
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+        mesh = self.read(key)
+        if mesh is None:
+            self.misses += 1
+            mesh = build(dimensions, side)
+            self.write(key, mesh)
+        else:
+            self.hits += 1
+        self.remember(key, mesh)
+        return mesh
+
+    def remember(self, key, mesh):
+        """Store a mesh in the memory tier, evicting the least recently used meshes above the memory limit."""
+        for array in mesh:
+            # Cached arrays are shared between loads, so they must never be modified in place
+            array.flags.writeable = False
+        self.memory[key] = mesh
+        self.memory_bytes += mesh[0].nbytes + mesh[1].nbytes
+        while self.memory_bytes > self.memory_limit and len(self.memory) > 1:
+            _, (vertices, edges) = self.memory.popitem(last=False)
+            self.memory_bytes -= vertices.nbytes + edges.nbytes
+
+    def read(self, key):
+        """Return a mesh from the disk tier, or None if it isn't cached or can't be read."""
+        file_name = self.file_name(key)
+        if not os.path.exists(file_name):
+            return None
+        try:
+            mesh = binary.read_shape(file_name)
+        except OSError:
+            mesh = None
+        if mesh is None:
+            self.remove(file_name)
+            return None
+        # Marks the file as recently used for eviction
+        os.utime(file_name)
+        return mesh
+
+    def write(self, key, mesh):
+        """Store a mesh in the disk tier and evict the least recently used files above the disk limit."""
+        file_name = self.file_name(key)
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            binary.write_shape(file_name, *mesh)
+            self.evict()
+        except OSError as error:
+            print("[NOTICE] Preset could not be cached on disk: " + str(error))
+
+    def evict(self):
+        """Delete the least recently used cache files until the disk tier is within its limit."""
+        files = []
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.endswith(".wfb"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files[:-1]:
+            if total <= self.disk_limit:
+                break
+            self.remove(path)
+            total -= size
+
+    def remove(self, file_name):
+        """Delete a cache file, ignoring files that are already gone."""
+        try:
+            os.remove(file_name)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Empty both tiers."""
+        self.memory.clear()
+        self.memory_bytes = 0
+        if os.path.isdir(self.folder):
+            for entry in os.scandir(self.folder):
+                if entry.is_file() and entry.name.endswith(".wfb"):
+                    self.remove(entry.path)
+
+geometry = GeometryCache()
@@ -0,0 +1,101 @@
+"""
+Module for the command console of the N-Dimensional Wireframe Renderer.
+
+The console reads commands on a background thread, prompting for any answers that
+weren't typed after the command, and posts each complete command to a queue. The
+main loop runs the queued commands once per frame, so the display keeps rendering
+and rotating while commands are being typed, and every command still changes the
+wireframe from the main thread only.
+"""
+
+import queue
+import threading
+import pygame
+import panel
+import tracing
+
+commands = queue.Queue()
+# Wakes the main loop from its idle wait as soon as a command is queued
+COMMAND_EVENT = pygame.USEREVENT + 1
+
+def read_arguments(command, args):
+    """Prompt for the answers of a command that weren't typed after it, returning None if the user cancels with '/' or declines a confirmation."""
+    position = 0
+    for prompt, count in panel.prompts.get(command, []):
+        count = panel.word_count(count)
+        if count == 0:
+            # The answer is the rest of the line, such as a file name with spaces
+            if position == len(args):
+                line = input(prompt).strip()
+                if line == "/":
+                    return None
+                args.append(line)
+            return args
+        while len(args) - position < count:
+            line = input(prompt)
+            if line.strip() == "/":
+                return None
+            args += line.split()
+        position += count
+    return confirm(command, args, position)
+
+def confirm(command, args, position):
+    """Ask the confirmation a command needs for its answers unless it was typed, returning None if the user declines."""
+    if command not in panel.confirmations or len(args) > position:
+        return args
+    question = panel.confirmations[command](args)
+    if question is None:
+        return args
+    while True:
+        line = input(question).strip().lower()
+        if line == "y":
+            args.append(line)
+            return args
+        if line in ("n", "/"):
+            return None
+        print("Invalid response!")
+
+def run():
+    """Read commands from the terminal until it closes, queueing each one and waiting for the main loop to run it."""
+    while True:
+        try:
+            line = input("Enter a command: ")
+            if line.strip() in ("", "/"):
+                continue
+            command, args = panel.parse_command(line)
+            if command is None:
+                print("Invalid command!")
+                print("     Enter 'help' to view available commands.")
+                continue
+            args = read_arguments(command, args)
+            if args is None:
+                continue
+        except EOFError:
+            return
+        done = threading.Event()
+        commands.put((command, args, done))
+        pygame.event.post(pygame.event.Event(COMMAND_EVENT))
+        # The next prompt waits for the command's output so the two don't interleave
+        done.wait()
+        if command == "quit":
+            return
+
+def start():
+    """Start reading commands on a background thread."""
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+def update():
+    """Run every command queued since the last frame."""
+    while True:
+        try:
+            command, args, done = commands.get_nowait()
+        except queue.Empty:
+            return
+        tracing.recorder.command(command, args)
+        try:
+            panel.execute(command, args)
+        except ValueError as error:
+            print("[NOTICE] " + str(error))
+        finally:
+            done.set()
@@ -3,12 +3,17 @@ Module for storing global data classes and runtime instances
 used by the N-Dimensional Wireframe Renderer.
 
 Contains classes for managing the display, rotation parameters, 
-application state, and wireframe geometry. Also provides global 
+application state, wireframe geometry (an indexed vertex/edge mesh), and 
+frame-time profiling. Also provides global 
 instances of these classes for easy access throughout the program.
 """
 
 import pygame
 import math
+import time
+from collections import deque
+import numpy as np
+import cache
     
 class Display:
     """Initializes and manages the Pygame window, fonts, and color palettes."""
@@ -23,23 +28,129 @@ class Display:
         self.screen_color = self.palettes[self.current_palette][0]
         self.line_color = self.palettes[self.current_palette][1]
         self.font_color = self.palettes[self.current_palette][2]
+        self.idle_timeout = 250
+        self.backend = "pygame"
+        self.blend_strength = 0.5
+        # Segments spanning fewer pixels than this are culled before drawing (0 draws every segment)
+        self.min_segment = 0.5
+        self.target_fps = 60
+        self.last_frame = None
+        # Rows and columns of the viewport grid; a 1 x 1 grid is the usual single view
+        self.grid = (1, 1)
+        self.viewports = [Viewport()]
     
     def initialize_pygame(self):
-        pygame.init()
+        """Start only the display and font modules of pygame and open the window."""
+        pygame.display.init()
+        pygame.font.init()
         self.screen = pygame.display.set_mode((self.side, self.side))
         pygame.display.set_caption("Wireframe Renderer")
-        self.font = pygame.font.SysFont("arial",20)
+        self.load_font()
+        self.clock = pygame.time.Clock()
+
+    def load_font(self):
+        """Load the display font from its cached file path, scanning the system fonts only on the first launch."""
+        # Falls back to pygame's default font like SysFont does when Arial isn't installed
+        self.font = pygame.font.Font(cache.font_file("arial", pygame.font.match_font) or None, 20)
+
+    def set_grid(self, rows, columns):
+        """Split the display into a grid of viewports, each starting with the default projection."""
+        self.grid = (rows, columns)
+        self.viewports = [Viewport() for _ in range(rows * columns)]
+
+    def viewport_rect(self, index):
+        """Return the (x, y, width, height) of a viewport's cell on the display."""
+        rows, columns = self.grid
+        width, height = self.side / columns, self.side / rows
+        return (index % columns) * width, (index // columns) * height, width, height
+
+    def initialize_headless(self):
+        """Set up an offscreen surface and font without opening a window or starting the event pump."""
+        pygame.font.init()
+        self.screen = pygame.Surface((self.side, self.side))
+        self.load_font()
+
+class Viewport:
+    """Projection settings of one cell of the viewport grid; settings left as None follow the global view."""
+    def __init__(self):
+        # Perspective depth of this viewport (0 for orthographic)
+        self.perspective = None
+        # Axes of the rotated vertex buffer projected in this viewport, in order
+        self.axes = None
+
+    def depth(self):
+        """Return the perspective depth the viewport projects with."""
+        return states.perspective if self.perspective is None else self.perspective
+
+    def key(self):
+        """Return the settings the viewport's projection depends on."""
+        return (self.depth(), None if self.axes is None else tuple(self.axes))
+
+    def label(self):
+        """Return a short description of the viewport's projection."""
+        axes = "all axes" if self.axes is None else "axes " + ",".join(str(axis) for axis in self.axes)
+        return "Depth " + str(self.depth()) + ", " + axes
 
 class Rotation:
     """Stores rotation parameters and state for N-dimensional transformations."""
     def __init__(self):
-        self.speed = 30
+        # Angular velocity in radians per second (2.5 degrees per frame at 30 frames per second)
+        self.velocity = math.pi * 5 / 12
         self.speed_multiplier = 1
+        self.max_step = 0.1
         self.plane = [0,2]
+        # Fixed angle per frame for frame-based rotation schedules
         self.theta = math.pi / 72
         self.angle_rotated = 0
         self.auto_rotate = False
+        # Angular velocities in radians per second of the planes that spin together during auto-rotation, by (axis, axis)
+        self.velocities = {}
         self.center = [0,0]
+        self.orthonormalize_interval = 100
+        # Counts changes to the orientation, so cached projections know when they are out of date
+        self.version = 0
+        self.reset(3)
+
+    def reset(self, dimensions):
+        """Reset the accumulated orientation to the identity transform for the given number of dimensions."""
+        self.matrix = np.identity(dimensions)
+        self.offset = np.zeros(dimensions)
+        self.steps = 0
+        self.version += 1
+
+    def rotate(self, theta, plane, center):
+        """Compose a Givens rotation by theta about a 2D center in the given plane into the accumulated orientation."""
+        axes = [min(plane), max(plane)]
+        center = np.asarray(center, dtype=float)
+        givens = np.array([[math.cos(theta), math.sin(theta)],
+                           [-math.sin(theta), math.cos(theta)]])
+        # Only the two rows of the plane change: x' = G(Ax + t - c) + c
+        self.matrix[axes] = givens @ self.matrix[axes]
+        self.offset[axes] = givens @ (self.offset[axes] - center) + center
+        self.steps += 1
+        if self.steps % self.orthonormalize_interval == 0:
+            # Snap the matrix back to the nearest orthonormal matrix so float error can't distort the shape over time
+            u, _, vt = np.linalg.svd(self.matrix)
+            self.matrix = u @ vt
+        self.version += 1
+
+    def spin(self, dt):
+        """Advance every spinning plane by its angular velocity over dt seconds, composing them all into the orientation."""
+        # Each plane only changes two rows of the orientation, so the vertices are still transformed once per frame
+        for plane, velocity in self.velocities.items():
+            self.rotate(velocity * self.speed_multiplier * dt, plane, self.center)
+
+    def is_identity(self):
+        """Return True if the accumulated orientation doesn't move any point."""
+        return np.array_equal(self.matrix, np.identity(len(self.matrix))) and not self.offset.any()
+
+    def transform(self, points):
+        """Apply the accumulated orientation to an (V x N) array of original points."""
+        return points @ self.matrix.T + self.offset
+
+    def inverse(self, points):
+        """Map an (V x N) array of on-screen points back to the original, unrotated geometry."""
+        return (points - self.offset) @ self.matrix
 
 class States:
     """Holds runtime states and rendering options."""
@@ -50,30 +161,269 @@ class States:
         self.info = False
         self.log = False
         self.quit = False
+        self.headless = False
+        self.dirty = True
+        self.loading = None
 
 class Wireframe:
-    """Contains wireframe geometry and available user commands."""
+    """Contains the original (unrotated) wireframe geometry as a deduplicated vertex buffer with an edge index array, and available user commands."""
     def __init__(self):
         self.side = 100
-        self.lines = []
+        # Points closer than the tolerance share a spatial hash cell, so they are stored as the same vertex
+        self.tolerance = 1e-6
+        self.vertices = np.empty((0, 3))
+        self.edges = np.empty((0, 2), dtype=np.intp)
+        self.vertex_index = {}
+        self.edge_index = {}
+        # Counts changes to the geometry, so cached projections know when they are out of date
+        self.version = 0
         self.commands = {
             "add": "Add a new line by entering two N-dimensional points.",
             "remove": "Remove a specific line using its two end points.",
             "view lines": "Display a list of all current lines on screen.",
             "clear": "Clear all lines from the display.",
             "center": "Set the rotation center (2D coordinates).",
+            "spin": "Set the auto-rotation speed of a plane (several planes can spin at once).",
             "plane": "Change the active rotation plane (two dimension indices).",
             "preset": "Load a preset object (e.g., hypercube, hyperpyramid).",
             "dimensions": "Set the number of dimensions for the wireframe.",
             "save": "Save the current wireframe to a file.",
             "load": "Load a wireframe from a saved file.",
+            "cancel": "Cancel a file that is still loading.",
+            "fps": "Set the target frame rate (0 for uncapped).",
+            "viewports": "Split the display into a grid of viewports (rows and columns).",
+            "viewport": "Set the perspective depth or projected axes of one viewport.",
+            "backend": "Select the line drawing backend (pygame, surfarray, additive).",
+            "workers": "Set the number of processes that project large shapes.",
+            "record": "Start or stop recording frames (add 'gif' for an animated GIF).",
+            "trace": "Start or stop recording keyboard input and commands to a trace file for replay.",
             "log": "Toggle console logging on or off.",
+            "perf": "Toggle frame-time profiling in the info overlay and log.",
             "keys": "Show a list of keyboard controls.",
             "help": "Display all available commands.",
             "quit": "Close the program."
         }
 
+    def clear(self, dimensions):
+        """Remove all vertices and edges, resizing the vertex buffer for the given number of dimensions."""
+        self.vertices = np.empty((0, dimensions))
+        self.edges = np.empty((0, 2), dtype=np.intp)
+        self.vertex_index = {}
+        self.edge_index = {}
+        self.version += 1
+
+    def quantize(self, points):
+        """Return the spatial hash cell of every point in an (V x N) array, as integer coordinates in units of the tolerance."""
+        return np.rint(points / self.tolerance).astype(np.int64)
+
+    def edge_keys(self, edges):
+        """Return an integer key for every edge of an (E x 2) index array that is the same for both end point orders."""
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        return np.minimum(edges[:, 0], edges[:, 1]) << 32 | np.maximum(edges[:, 0], edges[:, 1])
+
+    def vertex_lookup(self):
+        """Return the map from spatial hash cells to vertex indices, rebuilding it if a bulk change dropped it."""
+        if self.vertex_index is None:
+            self.vertex_index = {}
+            for i, key in enumerate(self.quantize(self.vertices).tolist()):
+                self.vertex_index.setdefault(tuple(key), i)
+        return self.vertex_index
+
+    def edge_lookup(self):
+        """Return the map from edge keys to edge rows, rebuilding it if a bulk change dropped it."""
+        if self.edge_index is None:
+            self.edge_index = dict(zip(self.edge_keys(self.edges).tolist(), range(len(self.edges))))
+        return self.edge_index
+
+    def vertex_ids(self, points):
+        """Return the vertex buffer indices of an array of points, appending the points that are not stored yet."""
+        keys = self.quantize(points)
+        if len(self.vertices) == 0:
+            # Nothing to match against, so duplicates are merged in one vectorized pass over the raw bytes of each
+            # row of cells and the index is built on demand
+            rows = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.itemsize * keys.shape[1]))).reshape(-1)
+            _, first, ids = np.unique(rows, return_index=True, return_inverse=True)
+            self.vertices = points[first]
+            self.vertex_index = None
+            return ids.reshape(-1)
+        vertex_index = self.vertex_lookup()
+        ids = np.empty(len(points), dtype=np.intp)
+        new_vertices = []
+        for i, key in enumerate(keys.tolist()):
+            key = tuple(key)
+            if key not in vertex_index:
+                vertex_index[key] = len(self.vertices) + len(new_vertices)
+                new_vertices.append(points[i])
+            ids[i] = vertex_index[key]
+        if new_vertices:
+            self.vertices = np.vstack((self.vertices, new_vertices))
+        return ids
+
+    def add_mesh(self, vertices, edges):
+        """Add a mesh of on-screen vertices and edge indices, returning the duplicate edge count."""
+        # vertices is a (V x N) array and edges an (E x 2) array of indices into it, inserted in one batch
+        ids = self.vertex_ids(rotation.inverse(np.asarray(vertices, dtype=float).reshape(-1, self.vertices.shape[1])))
+        edges = ids[np.asarray(edges, dtype=np.intp).reshape(-1, 2)]
+        keys = self.edge_keys(edges)
+        # Edges repeated within the batch are dropped first, keeping the first occurrences in their original order
+        _, first = np.unique(keys, return_index=True)
+        first.sort()
+        start = len(self.edges)
+        if start > 0:
+            edge_index = self.edge_lookup()
+            first = first[np.fromiter((key not in edge_index for key in keys[first].tolist()), dtype=bool, count=len(first))]
+        self.edges = np.vstack((self.edges, edges[first]))
+        if start == 0:
+            self.edge_index = None
+        else:
+            self.edge_index.update(zip(keys[first].tolist(), range(start, len(self.edges))))
+        self.version += 1
+        return len(edges) - len(first)
+
+    def load_mesh(self, vertices, edges):
+        """Use vertex and edge arrays as the mesh without copying them, if possible."""
+        # Only an empty, unrotated wireframe can be backed by the arrays directly, anything else goes through add_mesh
+        keys = self.edge_keys(edges)
+        if len(self.vertices) != 0 or not rotation.is_identity() or len(np.unique(keys)) != len(keys):
+            return self.add_mesh(vertices, edges)
+        # Edges are only compared by index here, so vertices sharing a spatial hash cell are merged by add_mesh instead
+        if len(np.unique(self.quantize(vertices), axis=0)) != len(vertices):
+            return self.add_mesh(vertices, edges)
+        # The original geometry is never modified in place, so read-only arrays can back the mesh directly
+        self.vertices = vertices
+        self.edges = edges
+        self.vertex_index = None
+        self.edge_index = None
+        self.version += 1
+        return 0
+
+    def add_lines(self, points_1, points_2):
+        """Add a batch of lines given as two (E x N) arrays of on-screen end points, returning the number of duplicate lines skipped."""
+        points_1 = np.asarray(points_1, dtype=float).reshape(-1, self.vertices.shape[1])
+        points_2 = np.asarray(points_2, dtype=float).reshape(-1, self.vertices.shape[1])
+        indices = np.arange(len(points_1))
+        return self.add_mesh(np.vstack((points_1, points_2)), np.column_stack((indices, indices + len(points_1))))
+
+    def add_line(self, point_1, point_2):
+        """Add a single line between two points, returning False if the line already exists."""
+        return self.add_lines([point_1], [point_2]) == 0
+
+    def find_line(self, point_1, point_2):
+        """Return the row of the edge between two on-screen points (in either order) within the tolerance, or None if there is none."""
+        keys = self.quantize(rotation.inverse(np.array([point_1, point_2], dtype=float)))
+        vertex_index = self.vertex_lookup()
+        ids = [vertex_index.get(tuple(key)) for key in keys.tolist()]
+        if None in ids:
+            return None
+        return self.edge_lookup().get(int(self.edge_keys(ids)[0]))
+
+    def has_line(self, point_1, point_2):
+        """Return True if there is an edge between two on-screen points."""
+        return self.find_line(point_1, point_2) is not None
+
+    def remove_line(self, point_1, point_2):
+        """Remove the edge between two on-screen points (in either order), returning False if there is none."""
+        row = self.find_line(point_1, point_2)
+        if row is None:
+            return False
+        if not self.edges.flags.writeable:
+            # Memory-mapped or cached edges are read-only, so they are copied before the first change
+            self.edges = self.edges.copy()
+        # The last edge moves into the removed row, so nothing else has to shift
+        last = len(self.edges) - 1
+        del self.edge_index[int(self.edge_keys(self.edges[row])[0])]
+        if row != last:
+            self.edges[row] = self.edges[last]
+            self.edge_index[int(self.edge_keys(self.edges[row])[0])] = row
+        self.edges = self.edges[:last]
+        self.version += 1
+        return True
+
+    def remove_edges(self, keys, vertex_count=None):
+        """Remove every edge whose key is in an array of edge keys, and the vertices from vertex_count on if no edge uses them."""
+        self.edges = self.edges[~np.isin(self.edge_keys(self.edges), keys)]
+        self.edge_index = None
+        if vertex_count is not None and (len(self.edges) == 0 or self.edges.max() < vertex_count):
+            self.vertices = self.vertices[:vertex_count]
+            self.vertex_index = None
+        self.version += 1
+
+    def mesh(self):
+        """Return the on-screen vertices used by at least one edge and the edges re-indexed into them."""
+        used, edges = np.unique(self.edges, return_inverse=True)
+        if len(used) == len(self.vertices):
+            used, edges = slice(None), self.edges
+        vertices = self.vertices[used]
+        if not rotation.is_identity():
+            vertices = rotation.transform(vertices)
+        return vertices, edges.reshape(-1, 2)
+
+    def line_points(self):
+        """Return the on-screen end points of every edge as two (E x N) arrays."""
+        vertices = rotation.transform(self.vertices)
+        return vertices[self.edges[:, 0]], vertices[self.edges[:, 1]]
+
+class Profiler:
+    """Records per-stage frame timings and edge counts over a rolling window of frames."""
+    def __init__(self):
+        self.enabled = False
+        self.window = 120
+        self.log_interval = 120
+        self.stages = ["rotate","transform","project","clip","draw","text","flip"]
+        self.reset()
+
+    def reset(self):
+        """Discard all recorded samples."""
+        self.samples = {stage: deque(maxlen=self.window) for stage in self.stages + ["frame"]}
+        self.current = {}
+        self.edges = 0
+        self.culled = 0
+        self.subpixel = 0
+        self.frames = 0
+        self.frame_start = None
+
+    def start(self):
+        """Return the start time of a stage, or None when profiling is disabled."""
+        if not self.enabled:
+            return None
+        return time.perf_counter()
+
+    def stop(self, stage, start):
+        """Add the time elapsed since start to the stage's total for the current frame."""
+        if start is None:
+            return
+        self.current[stage] = self.current.get(stage, 0) + time.perf_counter() - start
+
+    def count(self, edges, culled, subpixel=0):
+        """Record the number of edges drawn and culled in the current frame, and how many of the culled ones were shorter than a pixel."""
+        if self.enabled:
+            self.edges = edges
+            self.culled = culled
+            self.subpixel = subpixel
+
+    def end_frame(self):
+        """Store the stage totals of the current frame, returning True when a log line is due."""
+        if not self.enabled:
+            return False
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.samples["frame"].append(now - self.frame_start)
+        self.frame_start = now
+        for stage in self.stages:
+            self.samples[stage].append(self.current.get(stage, 0))
+        self.current = {}
+        self.frames += 1
+        return self.frames % self.log_interval == 0
+
+    def summary(self, stage):
+        """Return the rolling average and 95th percentile of a stage in milliseconds."""
+        if len(self.samples[stage]) == 0:
+            return 0, 0
+        values = np.array(self.samples[stage]) * 1000
+        return values.mean(), np.percentile(values, 95)
+
 display = Display()
 rotation = Rotation()
 states = States()
-wireframe = Wireframe()
\ No newline at end of file
+wireframe = Wireframe()
+profiler = Profiler()
\ No newline at end of file
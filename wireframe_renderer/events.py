@@ -8,9 +8,12 @@ actions, color palette changes, screenshots, and other runtime commands.
 import pygame
 import data
 import panel
+import console
+import loader
+import recording
+import tracing
 import math
-import os
-import utils
+import time
 import render
 
 def swap_plane(event):
@@ -40,40 +43,18 @@ def swap_plane(event):
     data.rotation.plane[1] = axis_2
     data.rotation.center = [0,0]
 
-def rotate(event):
-    """Rotate all wireframe lines in the current plane."""
-    # Clear the current screen and lines, while copying the line values
-    data.display.screen.fill(data.display.screen_color)
-    center = data.rotation.center
-    lines = data.wireframe.lines[:]
-    data.wireframe.lines.clear()
+def rotate(event, dt):
+    """Rotate the wireframe in the current plane by the angle covered in dt seconds at the current angular velocity."""
+    theta = data.rotation.velocity * data.rotation.speed_multiplier * dt
+    if event == "left":
+        theta = -theta
     # Records the angle rotated in degrees
-    if event == "right":
-        data.rotation.angle_rotated += data.rotation.theta * 180 / math.pi
-    else:
-        data.rotation.angle_rotated -= data.rotation.theta * 180 / math.pi
-    for line in lines:
-        new_line = [line[0][:], line[1][:]]
-        for i in range(2):
-            # For each line, find the distance and angle from the center, add or subtract theta, and find the new coordinates
-            point= [line[i][min(data.rotation.plane)],line[i][max(data.rotation.plane)]]
-            dist = utils.pythag(point[0] - center[0], point[1] - center[1])
-            theta = math.atan2(point[0] - center[0], point[1] - center[1])
-            if event == "right":
-                point[0] = center[0] + dist * math.sin(theta + data.rotation.theta)
-                point[1] = center[1] + dist * math.cos(theta + data.rotation.theta)
-            else:
-                point[0] = center[0] + dist * math.sin(theta - data.rotation.theta)
-                point[1] = center[1] + dist * math.cos(theta - data.rotation.theta)
-            new_line[i][min(data.rotation.plane)] = point[0]
-            new_line[i][max(data.rotation.plane)] = point[1]
-        # Add the lines with the new coordinates
-        render.add_line(new_line[0],new_line[1])
+    data.rotation.angle_rotated += theta * 180 / math.pi
+    data.rotation.rotate(theta, data.rotation.plane, data.rotation.center)
 
 def handle_slash():
-    """Pause display and open command panel."""
-    print("[INFO] The display is paused while the command panel is open.")
-    panel.panel()
+    """Remind the user where commands are entered."""
+    print("[INFO] Commands are entered in this console while the display keeps running. Enter 'help' to view available commands.")
 
 def handle_escape():
     """Quit the application."""
@@ -83,9 +64,9 @@ def handle_up():
     """Rotate the plane selection up."""
     swap_plane("up")
     if data.states.info:
-        render.redraw()
+        data.states.dirty = True
     if data.states.log:
-        if not data.rotation.angle_rotated == 0 and not len(data.wireframe.lines) == 0:
+        if not data.rotation.angle_rotated == 0 and not len(data.wireframe.edges) == 0:
             print("[LOG:ROTATE] Rotated " + str(data.rotation.angle_rotated) + " degrees in the (" + str(min(data.rotation.plane)) + "," + str(max(data.rotation.plane)) + ") plane.")
             data.rotation.angle_rotated = 0
         print("[LOG:STATE] Rotation plane set to (" + str(min(data.rotation.plane)) + "," + str(max(data.rotation.plane)) + ").")
@@ -94,37 +75,32 @@ def handle_down():
     """Rotate the plane selection down."""
     swap_plane("down")
     if data.states.info:
-        render.redraw()
+        data.states.dirty = True
     if data.states.log:
-        if not data.rotation.angle_rotated == 0 and not len(data.wireframe.lines) == 0:
+        if not data.rotation.angle_rotated == 0 and not len(data.wireframe.edges) == 0:
             print("[LOG:ROTATE] Rotated " + str(data.rotation.angle_rotated) + " degrees in the (" + str(min(data.rotation.plane)) + "," + str(max(data.rotation.plane)) + ") plane.")
             data.rotation.angle_rotated = 0
         print("[LOG:STATE] Rotation plane set to (" + str(min(data.rotation.plane)) + "," + str(max(data.rotation.plane)) + ").")
 
 def handle_screenshot():
-    """Save a screenshot of the current display."""
-    if not os.path.exists("screenshots"):
-        os.makedirs("screenshots")
-        print("[INFO] Created missing folder: 'screenshots'.")
-    screenshot_name = "screenshots/Screenshot.png"
-    number_of_pngs = 1
-    while os.path.exists(screenshot_name):
-        screenshot_name = "screenshots/Screenshot" + str(number_of_pngs) + ".png"
-        number_of_pngs += 1
-    pygame.image.save(data.display.screen,screenshot_name)
-    print("[SUCCESS] Saved screenshot as {" + screenshot_name + "}.")
+    """Save a screenshot of the current display without waiting for the file to be written."""
+    recording.recorder.screenshot(data.display.screen)
+
+def handle_record():
+    """Start or stop recording every rendered frame."""
+    recording.recorder.toggle()
 
 def handle_q():
     """Toggle scale correction."""
     data.states.scale_correction = not data.states.scale_correction
-    render.redraw()
+    data.states.dirty = True
     if data.states.log:
         print("[LOG:VIEW] Scale correction toggle set to " + str(data.states.scale_correction) + ".")
 
 def handle_r():
     """Toggle auto-rotation."""
     data.rotation.auto_rotate = not data.rotation.auto_rotate
-    render.redraw()
+    data.states.dirty = True
     if data.states.log:
         print("[LOG:ROTATE] Auto rotate toggle set to " + str(data.rotation.auto_rotate) + ".")
 
@@ -133,7 +109,7 @@ def handle_plus():
     if data.states.perspective < 5:
         data.states.perspective += 0.2
         data.states.perspective = round(data.states.perspective, 1)
-        render.redraw()
+        data.states.dirty = True
         if data.states.log:
             print("[LOG:VIEW] Perspective depth set to " + str(data.states.perspective) + ".")
     else:
@@ -144,7 +120,7 @@ def handle_minus():
     if data.states.perspective > 0:
         data.states.perspective += -0.2
         data.states.perspective = round(data.states.perspective, 1)
-        render.redraw()
+        data.states.dirty = True
         if data.states.log:
             print("[LOG:VIEW] Perspective depth set to " + str(data.states.perspective) + ".")
     else:
@@ -155,7 +131,7 @@ def handle_left_bracket():
     if data.rotation.speed_multiplier > 0.6:
         data.rotation.speed_multiplier += -0.2
         data.rotation.speed_multiplier = round(data.rotation.speed_multiplier, 1)
-        render.redraw()
+        data.states.dirty = True
         if data.states.log:
             print("[LOG:VIEW] Rotation speed set to " + str(data.rotation.speed_multiplier) + "x.")
     else:
@@ -166,7 +142,7 @@ def handle_right_bracket():
     if data.rotation.speed_multiplier < 5:
         data.rotation.speed_multiplier += 0.2
         data.rotation.speed_multiplier = round(data.rotation.speed_multiplier, 1)
-        render.redraw()
+        data.states.dirty = True
         if data.states.log:
             print("[LOG:VIEW] Rotation speed set to " + str(data.rotation.speed_multiplier) + "x.")
     else:
@@ -183,65 +159,150 @@ def handle_p():
     data.display.screen_color = data.display.palettes[palette][0]
     data.display.line_color = data.display.palettes[palette][1]
     data.display.font_color = data.display.palettes[palette][2]
-    render.redraw()
+    data.states.dirty = True
     if data.states.log:
         print("[LOG:VIEW] Color palette swapped to index " + str(data.display.current_palette) + ".")
 
+def handle_f():
+    """Toggle frame-time profiling."""
+    panel.handle_perf()
+
+def handle_b():
+    """Cycle through the line drawing backends."""
+    backends = list(render.backends)
+    data.display.backend = backends[(backends.index(data.display.backend) + 1) % len(backends)]
+    data.states.dirty = True
+    if data.states.log:
+        print("[LOG:VIEW] Draw backend set to " + data.display.backend + ".")
+
+def handle_c():
+    """Cancel a file that is still loading."""
+    if data.states.loading is not None:
+        loader.cancel()
+
 def handle_tab():
     """Toggle info panel visibility."""
-    if not data.states.info:
-        render.info()
-    else:
-        data.states.info = False
-        render.redraw()
+    data.states.info = not data.states.info
+    data.states.dirty = True
 
-def handle_rotate(direction):
-    """Rotate wireframe in the given direction."""
-    rotate(direction)
-    if data.states.info:
-        render.info()
-    text = data.display.font.render("Press '/' to open command panel",True,data.display.font_color)
-    data.display.screen.blit(text,(data.display.spacing,data.display.side - 2 * data.display.spacing))
+def handle_rotate(direction, dt):
+    """Rotate wireframe in the given direction for dt seconds."""
+    start = data.profiler.start()
+    rotate(direction, dt)
+    data.profiler.stop("rotate", start)
+    data.states.dirty = True
 
-def handle_events():
-    """Check for and respond to Pygame events."""
-    events = {
-        pygame.K_SLASH: handle_slash,
-        pygame.K_ESCAPE: handle_escape,
-        pygame.K_UP: handle_up,
-        pygame.K_DOWN: handle_down,
-        pygame.K_q: handle_q,
-        pygame.K_r: handle_r,
-        pygame.K_EQUALS: handle_plus,
-        pygame.K_MINUS: handle_minus,
-        pygame.K_LEFTBRACKET: handle_left_bracket,
-        pygame.K_RIGHTBRACKET: handle_right_bracket,
-        pygame.K_p: handle_p,
-        pygame.K_TAB: handle_tab
-    }
-    
-    clock = pygame.time.Clock()
+def handle_spin(dt):
+    """Auto-rotate for dt seconds: every spinning plane at its own speed, or the current plane if none are set."""
+    if len(data.rotation.velocities) == 0:
+        handle_rotate("right", dt)
+        return
+    start = data.profiler.start()
+    data.rotation.spin(dt)
+    data.profiler.stop("rotate", start)
+    data.states.dirty = True
 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            data.states.quit = True
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_s and (pygame.key.get_mods() & pygame.KMOD_CTRL):
-                handle_screenshot()
-            elif event.key in events:
-                events[event.key]()
+def animating():
+    """Return True if the wireframe rotates this frame (auto-rotation or a held arrow key)."""
+    if data.rotation.auto_rotate:
+        return True
+    key = pygame.key.get_pressed()
+    return len(data.wireframe.edges) != 0 and (key[pygame.K_RIGHT] or key[pygame.K_LEFT])
+
+key_handlers = {
+    pygame.K_SLASH: handle_slash,
+    pygame.K_ESCAPE: handle_escape,
+    pygame.K_UP: handle_up,
+    pygame.K_DOWN: handle_down,
+    pygame.K_q: handle_q,
+    pygame.K_r: handle_r,
+    pygame.K_EQUALS: handle_plus,
+    pygame.K_MINUS: handle_minus,
+    pygame.K_LEFTBRACKET: handle_left_bracket,
+    pygame.K_RIGHTBRACKET: handle_right_bracket,
+    pygame.K_p: handle_p,
+    pygame.K_TAB: handle_tab,
+    pygame.K_f: handle_f,
+    pygame.K_b: handle_b,
+    pygame.K_c: handle_c
+}
+
+def handle_key(key, ctrl=False):
+    """Respond to a key press, with ctrl True if a Ctrl key was held."""
+    if key == pygame.K_s and ctrl:
+        handle_screenshot()
+    elif key == pygame.K_r and ctrl:
+        handle_record()
+    elif key in key_handlers:
+        key_handlers[key]()
+
+def held_arrow():
+    """Return the arrow key held down to rotate ("right" or "left"), or None."""
     key = pygame.key.get_pressed()
-    if len(data.wireframe.lines) != 0 and not data.rotation.auto_rotate:
+    if key[pygame.K_RIGHT]:
+        return "right"
+    if key[pygame.K_LEFT]:
+        return "left"
+    return None
+
+def advance(dt, held):
+    """Rotate the wireframe for dt seconds while an arrow key is held or auto-rotation is on."""
+    if len(data.wireframe.edges) != 0 and not data.rotation.auto_rotate:
         # Print the log after the user releases the arrow keys and reset angle rotated to 0
-        if not key[pygame.K_RIGHT] and not key[pygame.K_LEFT]:
+        if held is None:
             if data.states.log and data.rotation.angle_rotated != 0:
                 print("[LOG:ROTATE] Rotated " + str(data.rotation.angle_rotated) + " degrees in the (" + str(min(data.rotation.plane)) + "," + str(max(data.rotation.plane)) + ") plane.")
             data.rotation.angle_rotated = 0
-        if key[pygame.K_RIGHT]:
-            handle_rotate("right")
-        elif key[pygame.K_LEFT]:
-            handle_rotate("left")
+        else:
+            handle_rotate(held, dt)
     if data.rotation.auto_rotate:
-        handle_rotate("right")
-    pygame.display.flip()
-    clock.tick(data.rotation.speed * data.rotation.speed_multiplier)
\ No newline at end of file
+        handle_spin(dt)
+
+def present():
+    """Redraw and show the frame, capturing it while recording."""
+    render.redraw()
+    start = data.profiler.start()
+    if not data.states.headless:
+        pygame.display.flip()
+    data.profiler.stop("flip", start)
+    recording.recorder.capture(data.display.screen)
+    data.states.dirty = False
+    if data.profiler.end_frame() and data.states.log:
+        print("[LOG:PERF] " + " | ".join(render.perf_info()) + ".")
+
+def handle_events():
+    """Check for and respond to Pygame events, redrawing the display only when the scene is dirty."""
+    if data.states.dirty or animating() or data.states.loading is not None:
+        pending = pygame.event.get()
+    else:
+        # Nothing on screen can change until an event arrives, so sleep until one does instead of spinning
+        pending = [pygame.event.wait(data.display.idle_timeout)] + pygame.event.get()
+    for event in pending:
+        if event.type == pygame.QUIT:
+            data.states.quit = True
+        elif event.type == pygame.WINDOWEXPOSED:
+            data.states.dirty = True
+        elif event.type == pygame.KEYDOWN:
+            ctrl = bool(pygame.key.get_mods() & pygame.KMOD_CTRL)
+            tracing.recorder.key(event.key, ctrl)
+            handle_key(event.key, ctrl)
+    # Rotation advances by the measured time since the previous rotating frame, so its speed doesn't depend on the frame rate
+    now = time.perf_counter()
+    if animating():
+        dt = 0 if data.display.last_frame is None else min(now - data.display.last_frame, data.rotation.max_step)
+        data.display.last_frame = now
+    else:
+        dt = 0
+        data.display.last_frame = None
+    held = held_arrow()
+    tracing.recorder.frame(dt, held)
+    advance(dt, held)
+    # Commands typed in the console since the last frame run here, on the main thread
+    console.update()
+    # Lines parsed by a streaming load since the last frame are added to the mesh
+    loader.update()
+    # Only redraw and flip when something changed since the last frame
+    if data.states.dirty:
+        present()
+    tracing.recorder.end_frame()
+    data.display.clock.tick(data.display.target_fps)
\ No newline at end of file
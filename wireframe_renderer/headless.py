@@ -0,0 +1,136 @@
+"""
+Module for rendering the N-Dimensional Wireframe Renderer without a window.
+
+Renders a preset or a saved shape into an offscreen surface following a rotation
+schedule, and writes every frame as a PNG image or as raw RGB pixel buffers. There
+is no event pump and no frame rate limit, so frames are produced as fast as the
+CPU allows. This makes it usable on display-less servers and in CI.
+
+Example:
+    python headless.py --preset hypercube --dimensions 5 --rotate 0 2 144 --rotate 1 4 72 --output frames
+"""
+
+import argparse
+import math
+import os
+import time
+import pygame
+import data
+import panel
+import parallel
+import presets
+import render
+
+def parse_args(argv=None):
+    """Parse the command line options for a headless render."""
+    parser = argparse.ArgumentParser(description="Render N-dimensional wireframes offscreen, without a window.")
+    shape = parser.add_mutually_exclusive_group(required=True)
+    shape.add_argument("--preset", choices=["hypercube","hyperpyramid"], help="preset object to render")
+    shape.add_argument("--file", help="name of a shape in the 'file_shapes' folder")
+    parser.add_argument("--dimensions", type=int, default=3, help="number of dimensions (default: 3)")
+    parser.add_argument("--perspective", type=float, default=1, help="perspective depth, 0 for orthographic (default: 1)")
+    parser.add_argument("--no-scale-correction", action="store_true", help="disable scale correction")
+    parser.add_argument("--rotate", nargs=3, type=int, action="append", default=[], metavar=("AXIS_1","AXIS_2","FRAMES"),
+                        help="rotate in the (AXIS_1,AXIS_2) plane for FRAMES frames; repeat to build a schedule")
+    parser.add_argument("--degrees", type=float, default=math.degrees(data.rotation.theta), help="degrees rotated per frame (default: 2.5)")
+    parser.add_argument("--center", nargs=2, type=float, default=[0,0], metavar=("X","Y"), help="rotation center in the rotation plane")
+    parser.add_argument("--palette", type=int, default=0, help="color palette index (default: 0)")
+    parser.add_argument("--info", action="store_true", help="draw the info overlay on every frame")
+    parser.add_argument("--workers", type=int, default=1, help="processes used to project shapes with at least 100000 vertices (default: 1)")
+    parser.add_argument("--output", help="folder to write frames to; frames are only rendered if omitted")
+    parser.add_argument("--format", choices=["png","raw"], default="png", help="write PNG images or one raw RGB24 buffer file (default: png)")
+    return parser.parse_args(argv)
+
+def initialize(args):
+    """Set up the offscreen display and runtime states from the command line options, returning False on invalid options."""
+    if args.dimensions < 2:
+        print("[ERROR] Invalid dimension.")
+        return False
+    if args.palette < 0 or args.palette >= len(data.display.palettes):
+        print("[ERROR] Palette index must be between 0 and " + str(len(data.display.palettes) - 1) + ".")
+        return False
+    for axis_1, axis_2, frames in args.rotate:
+        if axis_1 == axis_2 or not 0 <= axis_1 < args.dimensions or not 0 <= axis_2 < args.dimensions or frames < 0:
+            print("[ERROR] Invalid rotation (" + str(axis_1) + "," + str(axis_2) + ") for " + str(frames) + " frames.")
+            return False
+    if args.workers < 1:
+        print("[ERROR] Number of workers must be at least 1.")
+        return False
+    data.states.headless = True
+    data.display.initialize_headless()
+    parallel.pool.workers = args.workers
+    data.display.current_palette = args.palette
+    data.display.screen_color, data.display.line_color, data.display.font_color = data.display.palettes[args.palette]
+    data.states.perspective = max(args.perspective, 0)
+    data.states.scale_correction = not args.no_scale_correction
+    data.states.info = args.info
+    panel.set_dimensions(args.dimensions)
+    data.rotation.center = list(args.center)
+    return True
+
+def load_shape(args):
+    """Load the preset or saved shape requested on the command line, returning False if nothing could be loaded."""
+    if args.preset == "hypercube":
+        presets.hypercube(data.states.dimensions)
+    elif args.preset == "hyperpyramid":
+        presets.hyperpyramid(data.states.dimensions)
+    elif not panel.load_file(panel.shape_file_name(args.file)):
+        return False
+    return len(data.wireframe.edges) > 0
+
+def render_frames(args, write_frame):
+    """Render every frame of the rotation schedule, passing each one to write_frame, and return the number of frames."""
+    theta = math.radians(args.degrees)
+    frames = 0
+    if len(args.rotate) == 0:
+        # Without a schedule a single still frame is rendered
+        render.redraw()
+        write_frame(frames)
+        return 1
+    for axis_1, axis_2, count in args.rotate:
+        data.rotation.plane = [axis_1, axis_2]
+        for _ in range(count):
+            data.rotation.rotate(theta, data.rotation.plane, data.rotation.center)
+            render.redraw()
+            write_frame(frames)
+            frames += 1
+    return frames
+
+def main(argv=None):
+    """Render a shape offscreen and return a process exit code."""
+    args = parse_args(argv)
+    if not initialize(args) or not load_shape(args):
+        return 1
+    raw_file = None
+    if args.output is not None:
+        if not os.path.exists(args.output):
+            os.makedirs(args.output)
+            print("[INFO] Created missing folder: '" + args.output + "'.")
+        if args.format == "raw":
+            raw_file = open(os.path.join(args.output, "frames.rgb"), "wb")
+
+    def write_frame(index):
+        if args.output is None:
+            return
+        if raw_file is not None:
+            raw_file.write(pygame.image.tobytes(data.display.screen, "RGB"))
+        else:
+            pygame.image.save(data.display.screen, os.path.join(args.output, "frame_" + str(index).zfill(5) + ".png"))
+
+    start = time.perf_counter()
+    try:
+        frames = render_frames(args, write_frame)
+    finally:
+        if raw_file is not None:
+            raw_file.close()
+    elapsed = time.perf_counter() - start
+    print("[SUCCESS] Rendered " + str(frames) + " frames in " + str(round(elapsed, 3)) + " seconds (" + str(round(frames / max(elapsed, 1e-9), 1)) + " frames/second).")
+    if raw_file is not None:
+        print("[INFO] Raw frames are " + str(data.display.side) + "x" + str(data.display.side) + " RGB24, written to {" + raw_file.name + "}.")
+    return 0
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    finally:
+        pygame.quit()
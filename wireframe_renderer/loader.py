@@ -0,0 +1,185 @@
+"""
+Module for loading text wireframe files in chunks in the N-Dimensional Wireframe Renderer.
+
+Parses and validates a text file in a single pass, a chunk of lines at a time. A
+streaming load runs the parser on a background thread and hands each parsed chunk to
+the main loop, which adds it to the wireframe so the geometry appears progressively
+while the window stays responsive. A streaming load can be cancelled at any time,
+which removes everything it added.
+"""
+
+import os
+import queue
+import threading
+import time
+import numpy as np
+import data
+
+def read_chunks(file_name, dimensions, chunk_lines=8192, cancelled=None):
+    """Yield (lines, bytes read) pairs, where lines is a (k x 2N) array, raising ValueError on invalid file contents."""
+    with open(file_name, "rb") as file_pointer:
+        batch = []
+        line_numbers = []
+        bytes_read = 0
+        for index, line in enumerate(file_pointer, 1):
+            bytes_read += len(line)
+            test_line = line.split()
+            # Don't compute empty lines or comments
+            if len(test_line) == 0 or test_line[0] == b"#":
+                continue
+            if len(test_line) != dimensions * 2:
+                raise ValueError("File is not supported for " + str(dimensions) + " dimensions.")
+            batch.append(test_line)
+            line_numbers.append(index)
+            if len(batch) == chunk_lines:
+                yield parse_chunk(batch, line_numbers), bytes_read
+                batch = []
+                line_numbers = []
+                if cancelled is not None and cancelled.is_set():
+                    return
+        if batch:
+            yield parse_chunk(batch, line_numbers), bytes_read
+
+def parse_chunk(batch, line_numbers):
+    """Convert a batch of split lines to floats, raising ValueError with the line number of the first bad value."""
+    try:
+        return np.array(batch, dtype=float)
+    except ValueError:
+        # Only a failed chunk is checked line by line to find where the problem is
+        for test_line, index in zip(batch, line_numbers):
+            try:
+                [float(value) for value in test_line]
+            except ValueError:
+                raise ValueError("File contains unrecognized characters at line " + str(index) + ".")
+        raise
+
+class StreamingLoad:
+    """Loads a text wireframe file progressively, parsing it on a background thread."""
+    def __init__(self, file_name, dimensions, chunk_lines=2048, frame_budget=0.008, refresh_interval=0.2):
+        self.file_name = file_name
+        self.dimensions = dimensions
+        self.total_bytes = max(os.path.getsize(file_name), 1)
+        self.bytes_read = 0
+        self.lines = 0
+        self.duplicates = 0
+        self.error = None
+        self.chunk_lines = chunk_lines
+        # Seconds per frame spent adding chunks to the mesh, so a large file can't stall the display
+        self.frame_budget = frame_budget
+        # Redrawing a large mesh can cost more than adding a chunk, so the display only refreshes after the interval
+        # and once the mesh has grown by a quarter, keeping the total redraw cost proportional to the file size
+        self.refresh_interval = refresh_interval
+        self.last_refresh = 0
+        self.refresh_lines = 0
+        self.chunks = queue.Queue(maxsize=16)
+        self.cancelled = threading.Event()
+        # Everything this load adds is removed again if it fails or is cancelled. Other commands can change the mesh
+        # while it loads, so the added edges are tracked by key instead of by position
+        self.start_vertices = len(data.wireframe.vertices)
+        self.added = []
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Parse the file on the worker thread, queueing each chunk and finally a (None, error message) marker."""
+        error = None
+        try:
+            for chunk, bytes_read in read_chunks(self.file_name, self.dimensions, self.chunk_lines, self.cancelled):
+                self.put((chunk, bytes_read))
+        except ValueError as exception:
+            error = str(exception)
+        except OSError as exception:
+            error = "File could not be read: " + str(exception)
+        self.put((None, error))
+
+    def put(self, item):
+        """Queue an item for the main loop, giving up if the load is cancelled while the queue is full."""
+        while not self.cancelled.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def progress(self):
+        """Return the fraction of the file parsed so far."""
+        return self.bytes_read / self.total_bytes
+
+    def poll(self):
+        """Add parsed chunks to the wireframe until the frame budget is spent, returning False once the load has finished."""
+        start = time.perf_counter()
+        while time.perf_counter() - start < self.frame_budget:
+            try:
+                chunk, result = self.chunks.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                self.error = result
+                if result is not None:
+                    self.rollback()
+                    print("[ERROR] " + result)
+                else:
+                    print("[SUCCESS] " + str(self.lines) + " lines loaded from file {" + self.file_name + "}.")
+                    if self.duplicates > 0:
+                        print("[NOTICE] " + str(self.duplicates) + " duplicate line" + ("s" if self.duplicates != 1 else "") + " skipped.")
+                return False
+            edge_count = len(data.wireframe.edges)
+            self.duplicates += data.wireframe.add_lines(chunk[:, :self.dimensions], chunk[:, self.dimensions:])
+            # New edges are always appended, so the ones this chunk added are the rows after the old count
+            self.added.append(data.wireframe.edge_keys(data.wireframe.edges[edge_count:]))
+            self.lines += len(chunk)
+            self.bytes_read = result
+        if time.perf_counter() - self.last_refresh >= self.refresh_interval and self.lines >= 1.25 * self.refresh_lines:
+            self.last_refresh = time.perf_counter()
+            self.refresh_lines = self.lines
+            data.states.dirty = True
+        return True
+
+    def cancel(self):
+        """Stop the worker and remove every line this load added."""
+        self.cancelled.set()
+        self.rollback()
+        print("[NOTICE] Loading {" + self.file_name + "} cancelled.")
+
+    def rollback(self):
+        """Remove the edges this load added, and its vertices when no other edge uses them."""
+        if self.added:
+            data.wireframe.remove_edges(np.concatenate(self.added), self.start_vertices)
+        data.states.dirty = True
+
+def start(file_name):
+    """Start a streaming load of a text wireframe file, returning False if the file doesn't exist or a load is already running."""
+    if data.states.loading is not None:
+        print("[NOTICE] Action terminated.")
+        print("     Reason: {" + data.states.loading.file_name + "} is still loading.")
+        return False
+    if not os.path.exists(file_name):
+        print("[ERROR] File name not recognized.")
+        print("     Ensure that the file exists and is placed in the 'file_shapes' folder.")
+        return False
+    data.states.loading = StreamingLoad(file_name, data.states.dimensions)
+    data.states.dirty = True
+    return True
+
+def update():
+    """Feed the parsed chunks of the running load to the wireframe, once per frame."""
+    if data.states.loading is not None and not data.states.loading.poll():
+        data.states.loading = None
+        data.states.dirty = True
+
+def finish():
+    """Wait for the running load to finish, adding all of its lines before returning, and return False if it failed."""
+    load = data.states.loading
+    while data.states.loading is not None:
+        # Waits briefly for the worker to parse more instead of spinning
+        data.states.loading.thread.join(0.005)
+        update()
+    return load is None or load.error is None
+
+def cancel():
+    """Cancel the running load, if there is one."""
+    if data.states.loading is None:
+        print("[INFO] No file is currently loading.")
+        return
+    data.states.loading.cancel()
+    data.states.loading = None
@@ -2,20 +2,32 @@
 Main module for the N-Dimensional Wireframe Renderer.
 
 Initializes Pygame, sets up the display and runtime states, shows a welcome message,
-and runs the main event loop. This is the entry point for the application.
+and runs the main event loop. This is the entry point for the application. Only the
+work needed to show the first frame runs before it; the welcome message and console
+start right after, and the time from launch to the first frame is reported.
 """
 
+import time
+# Taken before the other imports, which are part of the startup time
+launched = time.perf_counter()
+
 import data
 import events
 import panel
+import console
+import recording
+import tracing
 import pygame
 
 def initialize():
-    """Set up the display, fill background, and show welcome message."""
+    """Set up the display and show the first frame, returning the seconds from launch until it was shown."""
     # Initialize classes
     data.display.initialize_pygame()
-    data.display.screen.fill(data.display.screen_color)
-    
+    events.handle_events()
+    return time.perf_counter() - launched
+
+def welcome():
+    """Show the welcome message and the keyboard and command help."""
     # Welcome message
     print("\n" + "═" * 70)
     print("★  N-Dimensional Wireframe Renderer  ★".center(70))
@@ -25,18 +37,21 @@ def initialize():
     print("Welcome! Here are some quick tips to get started:")
     panel.actions()
     panel.command_options()
-    
-    text = data.display.font.render("Press '/' to open command panel",True,data.display.font_color)
-    data.display.screen.blit(text,(data.display.spacing,data.display.side - 2 * data.display.spacing))
 
 def main():
     """Run the main program loop until the user quits."""
-    initialize()
-    panel.panel()
+    first_frame = initialize()
+    # Help text and the console can wait until the window shows something
+    welcome()
+    print("[INFO] First frame shown " + str(round(first_frame, 3)) + " seconds after launch.")
+    console.start()
     
     # Check for inputs
     while not data.states.quit:
         events.handle_events()
+    tracing.recorder.stop()
+    # Frames and screenshots still queued for the writer thread are saved before exiting
+    recording.recorder.close()
     pygame.quit()
 
 if __name__ == "__main__":
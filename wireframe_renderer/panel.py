@@ -3,15 +3,22 @@ Module for handling the command panel interface in the N-Dimensional Wireframe R
 
 Provides functions to process user input for modifying the wireframe, such as adding
 or removing lines, changing dimensions, adjusting rotation settings, toggling logging,
-loading and saving files, and applying preset shapes. The main panel loop allows
-interactive command execution while pausing the display.
+loading and saving files, and applying preset shapes. Every command can prompt for
+its answers or take them from a list of words typed after it, so commands can run
+from the console thread's queue without blocking the display.
 """
 
 import utils
-import render
+import binary
 import data
+import loader
+import parallel
 import presets
+import recording
+import tracing
+import math
 import os
+import numpy as np
 
 def actions():
     """Display a list of all keyboard controls and their functions."""
@@ -32,10 +39,14 @@ def actions():
     print("\n[ Display & Info ]")
     print("  TAB       Toggle object info overlay")
     print("  P         Cycle through color palettes")
+    print("  F         Toggle frame-time profiling")
+    print("  B         Cycle line drawing backends (pygame, surfarray, additive)")
+    print("  C         Cancel a file that is still loading")
     print("  CTRL+S    Save a screenshot to the 'screenshots' folder")
+    print("  CTRL+R    Start or stop recording frames to the 'recordings' folder")
 
     print("\n[ Commands & Program ]")
-    print("  /         Open command panel (pauses display)")
+    print("  /         Show how to enter commands")
     print("  ESC       Quit the program")
 
 def command_options():
@@ -48,13 +59,29 @@ def command_options():
         print("  " + command.ljust(15) + description)
 
     print("─" * 70)
-    print("Tip: Type '/' to cancel a prompt or return to the main display.")
+    print("Tip: Answers can follow the command (e.g. 'plane 0 3'). Type '/' to cancel a prompt.")
     print("─" * 70 + "\n")
     
-def handle_add():
+def read(args, prompt, count=1, default="/"):
+    """Return the answer to a prompt: the next count words of args (all of them for 0) when given, otherwise a line typed by the user."""
+    if args is None:
+        return input(prompt)
+    # A command run with arguments never prompts, so running out of them (including after an answer was rejected and
+    # the command asks again) fails it unless the prompt has a default
+    if len(args) == 0 or len(args) < count:
+        del args[:]
+        if default == "/":
+            raise ValueError("Command cancelled: an answer is missing or was not accepted.")
+        return default
+    count = count or len(args)
+    answer = " ".join(args[:count])
+    del args[:count]
+    return answer
+
+def handle_add(args=None):
     """Prompt the user to add a line by specifying two points."""
     while True:
-        user_input = input("Enter the coordinates of point 1: ")
+        user_input = read(args, "Enter the coordinates of point 1: ", data.states.dimensions)
         if user_input == "/":
             break
         point_one = user_input.split()
@@ -62,7 +89,7 @@ def handle_add():
             print("Invalid coordinates!")
             continue
         while True:
-            user_input = input("Enter the coordinates of point 2: ")
+            user_input = read(args, "Enter the coordinates of point 2: ", data.states.dimensions)
             if user_input == "/":
                 break
             point_two = user_input.split()
@@ -75,18 +102,20 @@ def handle_add():
             if point_two == point_one:
                 print("Invalid coordinates!")
                 continue
-            render.add_line(point_one,point_two)
-            render.redraw()
+            if not data.wireframe.add_line(point_one,point_two):
+                print("Line already exists!")
+                continue
+            data.states.dirty = True
             if data.states.log:
                 print("[LOG:VIEW] Added one line.")
             break
         break
 
-def handle_remove():
+def handle_remove(args=None):
     """Prompt the user to remove a line by specifying two points."""
     while True:
         removed = False
-        user_input = input("Enter the coordinates of point 1: ")
+        user_input = read(args, "Enter the coordinates of point 1: ", data.states.dimensions)
         if user_input == "/":
             break
         point_one = user_input.split()
@@ -94,7 +123,7 @@ def handle_remove():
             print("Invalid coordinates!")
             continue
         while True:
-            user_input = input("Enter the coordinates of point 2: ")
+            user_input = read(args, "Enter the coordinates of point 2: ", data.states.dimensions)
             if user_input == "/":
                 break
             point_two = user_input.split()
@@ -107,28 +136,41 @@ def handle_remove():
             if point_two == point_one:
                 print("Invalid coordinates!")
                 continue
-            remove_line = (point_one,point_two)
-            removed = False
-            lines = data.wireframe.lines[:]
-            for line in lines:
-                if utils.lines_equal(remove_line,line):
-                    data.wireframe.lines.remove(line)
-                    removed = True
+            removed = data.wireframe.remove_line(point_one,point_two)
             if not removed:
                 print("Line not found!")
                 print("     Enter 'view lines' to view current lines.")
                 break
-            render.redraw()
+            data.states.dirty = True
             if data.states.log:
                 print("[LOG:VIEW] Removed one line.")
             break
         if removed or user_input == "/":
             break
 
-def handle_dimensions():
+def set_dimensions(dimensions):
+    """Set the dimensionality of the wireframe, clearing all lines and resetting the rotation settings."""
+    if data.states.loading is not None:
+        loader.cancel()
+    data.states.dimensions = dimensions
+    if data.states.log:
+        print("[LOG:STATE] Dimension set to " + str(data.states.dimensions) + "D.")
+    data.rotation.center = [0,0]
+    data.rotation.velocities = {}
+    # Axes chosen for the old dimension may not exist anymore
+    for viewport in data.display.viewports:
+        viewport.axes = None
+    if data.states.dimensions == 2:
+        data.rotation.plane = [0,1]
+    else:
+        data.rotation.plane = [0,2]
+    data.wireframe.clear(data.states.dimensions)
+    data.rotation.reset(data.states.dimensions)
+
+def handle_dimensions(args=None):
     """Prompt the user to set the dimensionality of the wireframe and reset related settings."""
     while True:
-        user_input = input("Enter the dimension: ")
+        user_input = read(args, "Enter the dimension: ")
         if user_input == "/":
             break
         if not utils.valid_input(user_input.split(),1) or int(user_input) < 2:
@@ -136,8 +178,9 @@ def handle_dimensions():
             continue
         user_input = int(user_input)
         if user_input >= 10:
-            print("[NOTICE] High-dimensional objects may render slowly on some machines.")
-            confirm = input("    Are you sure you want to proceed? (y/n) ").lower()
+            if args is None:
+                print("[NOTICE] High-dimensional objects may render slowly on some machines.")
+            confirm = read(args, "    Are you sure you want to proceed? (y/n) ", default="y").lower()
             if confirm == "/":
                 break
             elif confirm == "n":
@@ -147,42 +190,107 @@ def handle_dimensions():
             else:
                 print("ಠ_ಠ  ...Your response has been set to 'no'.")
                 continue
-        data.states.dimensions = user_input
-        if data.states.log:
-            print("[LOG:STATE] Dimension set to " + str(data.states.dimensions) + "D.")
-        data.rotation.center = [0,0]
-        if data.states.dimensions == 2:
-            data.rotation.plane = [0,1]
-        else:
-            data.rotation.plane = [0,2]
-        data.wireframe.lines.clear()
-        render.redraw()
+        set_dimensions(user_input)
+        data.states.dirty = True
         break
 
 def handle_clear():
     """Clear all lines from the wireframe and refresh the display."""
-    data.wireframe.lines.clear()
-    render.redraw()
+    if data.states.loading is not None:
+        loader.cancel()
+    data.wireframe.clear(data.states.dimensions)
+    data.rotation.reset(data.states.dimensions)
+    data.states.dirty = True
     if data.states.log:
         print("[LOG:VIEW] Screen cleared.")
 
+def handle_fps(args=None):
+    """Prompt the user to set the target frame rate, independent of the rotation speed."""
+    while True:
+        user_input = read(args, "Enter the target frame rate (0 for uncapped): ")
+        if user_input == "/":
+            break
+        if not utils.valid_input(user_input.split(),1) or float(user_input) < 0:
+            print("Invalid frame rate!")
+            continue
+        data.display.target_fps = int(float(user_input))
+        data.states.dirty = True
+        if data.states.log:
+            print("[LOG:VIEW] Target frame rate set to " + (str(data.display.target_fps) if data.display.target_fps > 0 else "uncapped") + ".")
+        break
+
+def handle_viewports(args=None):
+    """Prompt the user to split the display into a grid of viewports."""
+    while True:
+        user_input = read(args, "Enter the number of rows and columns of viewports (1 1 for a single view): ", 2)
+        if user_input == "/":
+            break
+        grid = user_input.split()
+        if not utils.valid_input(grid,2) or not 1 <= int(float(grid[0])) <= 4 or not 1 <= int(float(grid[1])) <= 4:
+            print("Invalid grid! Rows and columns must be between 1 and 4.")
+            continue
+        data.display.set_grid(int(float(grid[0])), int(float(grid[1])))
+        data.states.dirty = True
+        if data.states.log:
+            print("[LOG:VIEW] Viewport grid set to " + str(data.display.grid[0]) + "x" + str(data.display.grid[1]) + ".")
+        break
+
+def handle_viewport(args=None):
+    """Prompt the user to set the perspective depth or the projected axes of one viewport."""
+    while True:
+        user_input = read(args, "Enter the viewport number and 'perspective DEPTH', 'axes A B ...' or 'reset': ", 0)
+        if user_input == "/":
+            break
+        values = user_input.split()
+        if len(values) < 2 or not utils.valid_input(values[:1],1) or not 1 <= int(float(values[0])) <= len(data.display.viewports):
+            print("Invalid viewport! Enter a number from 1 to " + str(len(data.display.viewports)) + ".")
+            continue
+        viewport = data.display.viewports[int(float(values[0])) - 1]
+        setting = values[1].lower()
+        if setting == "reset" and len(values) == 2:
+            viewport.perspective = None
+            viewport.axes = None
+        elif setting == "perspective" and utils.valid_input(values[2:],1) and 0 <= float(values[2]) <= 5:
+            viewport.perspective = round(float(values[2]), 1)
+        elif setting == "axes" and utils.valid_input(values[2:],len(values) - 2) and len(values) >= 4:
+            axes = [int(float(axis)) for axis in values[2:]]
+            if len(set(axes)) != len(axes) or min(axes) < 0 or max(axes) >= data.states.dimensions:
+                print("Invalid axes! Enter at least two different axes below " + str(data.states.dimensions) + ".")
+                continue
+            viewport.axes = axes
+        else:
+            print("Invalid setting! Enter 'perspective DEPTH' (0 to 5), 'axes A B ...' or 'reset'.")
+            continue
+        data.states.dirty = True
+        if data.states.log:
+            print("[LOG:VIEW] Viewport " + values[0] + " set to " + viewport.label().lower() + ".")
+        break
+
 def handle_log():
     """Toggle logging of actions and state changes on or off."""
     data.states.log = not data.states.log
     print("[INFO] Logging set to " + str(data.states.log) + ".")
-    render.redraw()
+    data.states.dirty = True
+
+def handle_perf():
+    """Toggle per-stage frame-time profiling on or off."""
+    data.profiler.enabled = not data.profiler.enabled
+    data.profiler.reset()
+    print("[INFO] Profiling set to " + str(data.profiler.enabled) + ".")
+    data.states.dirty = True
 
-def handle_view_lines():
+def handle_view_lines(args=None):
     """Display all current lines in the wireframe."""
-    if len(data.wireframe.lines) == 0:
+    if len(data.wireframe.edges) == 0:
         print("[INFO] No lines currently present on the screen.")
     else:
         proceed = True
         lines_before_warning = 50
-        if len(data.wireframe.lines) >= lines_before_warning:
-            print("[NOTICE] Large number of lines present.")
+        if len(data.wireframe.edges) >= lines_before_warning:
+            if args is None:
+                print("[NOTICE] Large number of lines present.")
             while True:
-                user_input = input("    You are about to print " + str(len(data.wireframe.lines)) + " lines. Are you sure you want to proceed? (y/n) ")
+                user_input = read(args, "    You are about to print " + str(len(data.wireframe.edges)) + " lines. Are you sure you want to proceed? (y/n) ", default="y")
                 if user_input == "/" or user_input.lower() == "n":
                     proceed = False
                     break
@@ -192,14 +300,14 @@ def handle_view_lines():
                     print("Invalid response!")
         if proceed:
             i = 1
-            for line in data.wireframe.lines:
-                print("Line " + str(i) + ": (" + " ".join(map(str, line[0])) + ") - (" + " ".join(map(str, line[1])) + ")")
+            for point_one, point_two in zip(*data.wireframe.line_points()):
+                print("Line " + str(i) + ": (" + " ".join(map(str, point_one.tolist())) + ") - (" + " ".join(map(str, point_two.tolist())) + ")")
                 i += 1
 
-def handle_center():
+def handle_center(args=None):
     """Prompt the user to set the center of the rotation plane."""
     while True:
-        user_input = input("Enter the center of the rotation plane: ")
+        user_input = read(args, "Enter the center of the rotation plane: ", 2)
         if user_input == "/":
             break
         center_point = user_input.split()
@@ -207,15 +315,15 @@ def handle_center():
             print("Invalid coordinates!")
             continue
         data.rotation.center = [float(center_point[0]),float(center_point[1])]
-        render.redraw()
+        data.states.dirty = True
         if data.states.log:
             print("[LOG:STATE] Rotation center set to (" + str(data.rotation.center[0]) + "," + str(data.rotation.center[1]) + ").")
         break
 
-def handle_plane():
+def handle_plane(args=None):
     """Prompt the user to set the rotation plane."""
     while True:
-        user_input = input("Enter the plane of rotation: ")
+        user_input = read(args, "Enter the plane of rotation: ", 2)
         if user_input == "/":
             break
         plane = user_input.split()
@@ -225,60 +333,173 @@ def handle_plane():
         plane[0] = int(plane[0])
         plane[1] = int(plane[1])
         data.rotation.plane = plane
-        render.redraw()
+        data.states.dirty = True
         if data.states.log:
             print("[LOG:STATE] Rotation plane set to (" + str(min(data.rotation.plane)) + "," + str(max(data.rotation.plane)) + ").")
         break
 
-def handle_load():
-    """Prompt the user to load lines from a file."""
+def handle_spin(args=None):
+    """Prompt the user to set the auto-rotation speed of a plane, or to stop every plane with 'clear'."""
     while True:
-        user_input = input("Enter the file name: ")
+        user_input = read(args, "Enter the plane and its speed in degrees per second (e.g. '0 3 30', 0 to stop, or 'clear'): ", 0)
+        if user_input == "/":
+            break
+        if user_input.strip().lower() == "clear":
+            data.rotation.velocities = {}
+            data.states.dirty = True
+            if data.states.log:
+                print("[LOG:STATE] Stopped all spinning planes.")
+            break
+        values = user_input.split()
+        if not utils.valid_input(values,3) or not utils.valid_input(values[:2],2):
+            print("Invalid plane or speed!")
+            continue
+        axis_1, axis_2 = int(float(values[0])), int(float(values[1]))
+        if axis_1 == axis_2 or not 0 <= axis_1 < data.states.dimensions or not 0 <= axis_2 < data.states.dimensions:
+            print("Invalid plane!")
+            continue
+        # A plane is stored by its axes in order, with the speed's sign flipped if they were given the other way round
+        plane = (min(axis_1, axis_2), max(axis_1, axis_2))
+        speed = math.radians(float(values[2])) * (1 if axis_1 < axis_2 else -1)
+        if speed == 0:
+            data.rotation.velocities.pop(plane, None)
+        else:
+            data.rotation.velocities[plane] = speed
+            if not data.rotation.auto_rotate:
+                data.rotation.auto_rotate = True
+                print("[INFO] Auto-rotation turned on.")
+        data.states.dirty = True
+        if data.states.log:
+            print("[LOG:STATE] Plane (" + str(plane[0]) + "," + str(plane[1]) + ") spinning at " + str(round(math.degrees(speed), 1)) + " degrees per second.")
+        break
+
+def shape_file_name(name):
+    """Return the path of a shape in the 'file_shapes' folder, which is the text file when no extension is given."""
+    file_name = "file_shapes/" + name
+    if name.endswith(".txt") or name.endswith(".wfb"):
+        return file_name
+    # Saving without an extension writes text, so the binary file is only used when there is no text file
+    if os.path.exists(file_name + ".wfb"):
+        if not os.path.exists(file_name + ".txt"):
+            return file_name + ".wfb"
+        print("[NOTICE] Both '" + name + ".txt' and '" + name + ".wfb' exist. Loading the text file; add '.wfb' to load the binary file.")
+    return file_name + ".txt"
+
+def load_file(file_name):
+    """Load every line of a wireframe file into the mesh in one batch, returning False if the file is invalid."""
+    if file_name.endswith(".wfb"):
+        return load_binary_file(file_name)
+    try:
+        # The file is validated and parsed in the same pass, one chunk of lines at a time
+        chunks = [chunk for chunk, _ in loader.read_chunks(file_name, data.states.dimensions)]
+    except FileNotFoundError:
+        print("[ERROR] File name not recognized.")
+        print("     Ensure that the file exists and is placed in the 'file_shapes' folder.")
+        return False
+    except ValueError as error:
+        print("[ERROR] " + str(error))
+        return False
+    # Both end points of every line are added to the mesh in one batch
+    lines = np.vstack(chunks) if chunks else np.empty((0, 2 * data.states.dimensions))
+    skipped = data.wireframe.add_lines(lines[:, :data.states.dimensions],lines[:, data.states.dimensions:])
+    print("[SUCCESS] " + str(len(lines)) + " lines loaded from file {" + file_name + "}.")
+    report_duplicates(skipped)
+    return True
+
+def load_binary_file(file_name):
+    """Memory-map a binary wireframe file into the mesh, returning False if the file is invalid."""
+    try:
+        shape = binary.read_shape(file_name)
+    except FileNotFoundError:
+        print("[ERROR] File name not recognized.")
+        print("     Ensure that the file exists and is placed in the 'file_shapes' folder.")
+        return False
+    if shape is None:
+        print("[ERROR] File is not a valid binary wireframe file.")
+        return False
+    vertices, edges = shape
+    if vertices.shape[1] != data.states.dimensions:
+        print("[ERROR] File is not supported for " + str(data.states.dimensions) + " dimensions.")
+        return False
+    skipped = data.wireframe.load_mesh(vertices, edges)
+    print("[SUCCESS] " + str(len(edges)) + " lines loaded from file {" + file_name + "}.")
+    report_duplicates(skipped)
+    return True
+
+def report_duplicates(skipped):
+    """Tell the user how many duplicate lines were left out of a load."""
+    if skipped > 0:
+        print("[NOTICE] " + str(skipped) + " duplicate line" + ("s" if skipped != 1 else "") + " skipped.")
+
+def handle_load(args=None):
+    """Prompt the user to load lines from a text or binary file."""
+    while True:
+        user_input = read(args, "Enter the file name: ", 0)
         if user_input == "/":
             break
         if not os.path.exists("file_shapes"):
             os.makedirs("file_shapes")
             print("[INFO] Created missing folder: 'file_shapes'.")
-        file_name = "file_shapes/" + user_input + ".txt"
-        if utils.valid_file(file_name):
-            with open(file_name,"r") as file_pointer:
-                lines = 0
-                for line in file_pointer:
-                    test_line = line.split()
-                    # Don't compute empty lines or comments
-                    if len(test_line) == 0 or test_line[0] == "#":
-                        continue
-                    point_one = test_line[:data.states.dimensions]
-                    point_two = test_line[data.states.dimensions:]
-                    for i in range(data.states.dimensions):
-                        point_one[i] = float(point_one[i])
-                        point_two[i] = float(point_two[i])
-                    render.add_line(point_one,point_two)
-                    lines += 1
-                print("[SUCCESS] " + str(lines) + " lines loaded from file {" + file_name + "}.")
+        file_name = shape_file_name(user_input)
+        if file_name.endswith(".wfb"):
+            if load_file(file_name):
+                data.states.dirty = True
                 break
+        # Text files are streamed in the background so the display stays responsive while they load
+        elif loader.start(file_name):
+            print("[INFO] Loading {" + file_name + "} in the background. Press C on the display to cancel.")
+            break
+
+def handle_cancel():
+    """Cancel a file that is still loading, removing the lines it has added so far."""
+    loader.cancel()
+
+def save_file(file_name):
+    """Write every current line to a wireframe file, as packed arrays if it is a binary (.wfb) file."""
+    if file_name.endswith(".wfb"):
+        binary.write_shape(file_name, *data.wireframe.mesh())
+        print("[SUCCESS] " + str(len(data.wireframe.edges)) + " lines saved to file {" + file_name + "}.")
+        return
+    with open(file_name,"w") as file_pointer:
+        file_pointer.write("# === Saved Wireframe ===\n")
+        file_pointer.write("#   Required Dimensions: " + str(data.states.dimensions) + "\n")
+        file_pointer.write("#   Lines: " + str(len(data.wireframe.edges)) + "\n")
+        file_pointer.write("\n\n\n")
+        for point_one, point_two in zip(*data.wireframe.line_points()):
+            for coordinate in point_one.tolist() + point_two.tolist():
+                file_pointer.write(str(coordinate) + " ")
+            file_pointer.write("\n")
+    print("[SUCCESS] " + str(len(data.wireframe.edges)) + " lines saved to file {" + file_name + "}.")
 
-def handle_save():
-    """Prompt the user to save all current lines to a file."""
+def handle_save(args=None):
+    """Prompt the user to save all current lines to a text file, or a binary file if the name ends in '.wfb'."""
     while True:
         proceed = True
         invalid_characters = " \\/.<>?*:|\""
-        user_input = input("Enter the file name: ")
+        user_input = read(args, "Enter the file name: ")
         if user_input == "/":
             break
+        # A '.wfb' extension saves the binary format instead of text
+        extension = ".txt"
+        if user_input.endswith(".wfb") or user_input.endswith(".txt"):
+            extension = user_input[-4:]
+            user_input = user_input[:-4]
         if user_input == "" or any (ch in invalid_characters for ch in user_input):
             print("Invalid file name!")
             continue
         if not os.path.exists("file_shapes"):
             os.makedirs("file_shapes")
             print("[INFO] Created missing folder: 'file_shapes'.")
-        file_name = "file_shapes/" + user_input + ".txt"
+        file_name = "file_shapes/" + user_input + extension
         if os.path.exists(file_name):
             while True:
-                print("[NOTICE] '" + user_input + ".txt' already exists in folder 'file_shapes'.")
-                overwrite = input("     Are you sure you want to overwrite the existing file? (y/n) ")
+                if args is None:
+                    print("[NOTICE] '" + user_input + extension + "' already exists in folder 'file_shapes'.")
+                overwrite = read(args, "     Are you sure you want to overwrite the existing file? (y/n) ", default="n")
                 if overwrite == "/" or overwrite.lower() == "n":
                     proceed = False
+                    if args is not None:
+                        print("[NOTICE] '" + user_input + extension + "' already exists in folder 'file_shapes'. Add 'y' after the file name to overwrite it.")
                     break
                 elif overwrite.lower() == "y":
                     break
@@ -286,24 +507,48 @@ def handle_save():
                     print("Invalid response!")
         # Ensures that the object won't be saved if the user decides not to overwrite a file
         if proceed:
-            with open(file_name,"w") as file_pointer:
-                file_pointer.write("# === Saved Wireframe ===\n")
-                file_pointer.write("#   Required Dimensions: " + str(data.states.dimensions) + "\n")
-                file_pointer.write("#   Lines: " + str(len(data.wireframe.lines)) + "\n")
-                file_pointer.write("\n\n\n")
-                for line in data.wireframe.lines:
-                    for point in line:
-                        for coordinate in point:
-                            file_pointer.write(str(coordinate) + " ")
-                    file_pointer.write("\n")
-                print("[SUCCESS] " + str(len(data.wireframe.lines)) + " lines saved to file {" + file_name + "}.")
-                break
+            save_file(file_name)
+            break
 
-def handle_preset():
+def handle_backend(args=None):
+    """Prompt the user to select the line drawing backend."""
+    available_backends = ["pygame","surfarray","additive"]
+    while True:
+        user_input = read(args, "Enter a draw backend: ").lower()
+        if user_input == "/":
+            break
+        if user_input not in available_backends:
+            print("Not a backend!")
+            print("Available backends:")
+            for backend in available_backends:
+                print("     " + backend)
+            continue
+        data.display.backend = user_input
+        data.states.dirty = True
+        if data.states.log:
+            print("[LOG:VIEW] Draw backend set to " + data.display.backend + ".")
+        break
+
+def handle_workers(args=None):
+    """Prompt the user to set the number of worker processes used to project large shapes."""
+    while True:
+        user_input = read(args, "Enter the number of workers (1 for single-core, up to " + str(os.cpu_count()) + "): ")
+        if user_input == "/":
+            break
+        if not utils.valid_input(user_input.split(),1) or float(user_input) < 1:
+            print("Invalid number of workers!")
+            continue
+        parallel.pool.workers = int(float(user_input))
+        data.states.dirty = True
+        if data.states.log:
+            print("[LOG:VIEW] Projection workers set to " + str(parallel.pool.workers) + " (used for shapes with at least " + str(parallel.pool.threshold) + " vertices).")
+        break
+
+def handle_preset(args=None):
     """Prompt the user to load a preset object (e.g., hypercube or hyperpyramid)."""
     available_presets = ["hypercube","hyperpyramid"]
     while True:
-        user_input = input("Enter a preset: ")
+        user_input = read(args, "Enter a preset: ")
         if user_input == "/":
             break
         if user_input not in available_presets:
@@ -313,43 +558,120 @@ def handle_preset():
                 print("     " + preset)
             continue
         if user_input == "hypercube":
-            presets.hypercube(data.states.dimensions)
+            report_duplicates(presets.hypercube(data.states.dimensions))
             if data.states.log:
                 print("[LOG:LOAD] Object hypercube loaded in " + str(data.states.dimensions) + " dimensions.")
         if user_input == "hyperpyramid":
-            presets.hyperpyramid(data.states.dimensions)
+            report_duplicates(presets.hyperpyramid(data.states.dimensions))
             if data.states.log and data.states.dimensions != 2:
                 print("[LOG:LOAD] Object hyperpyramid loaded in " + str(data.states.dimensions) + " dimensions.")
-        render.redraw()
+        data.states.dirty = True
         break
 
-def panel():
-    """Main command panel loop: prompts the user for commands and executes the corresponding handlers."""
-    command_handler = {
-        "add": handle_add,
-        "remove": handle_remove,
-        "dimensions": handle_dimensions,
-        "clear": handle_clear,
-        "log": handle_log,
-        "view lines": handle_view_lines,
-        "center": handle_center,
-        "plane": handle_plane,
-        "load": handle_load,
-        "save": handle_save,
-        "help": command_options,
-        "keys": actions,
-        "preset": handle_preset
-    }
-    command = ""
-    while True:
-        command = input("Enter a command: ").lower()
-        if command == "/":
-            break
-        elif command == "quit":
-            data.states.quit = True
-            break
-        if command not in command_handler:
-            print("Invalid command!")
-            print("     Enter 'help' to view available commands.")
-            continue
-        command_handler[command]()
\ No newline at end of file
+def handle_record(args=None):
+    """Start or stop recording every rendered frame, as PNG frames or an animated GIF ('record gif')."""
+    file_format = args[0].lower() if args else "png"
+    if file_format not in ("png","gif"):
+        raise ValueError("Not a recording format! Available formats: png, gif")
+    recording.recorder.toggle(file_format)
+
+def handle_trace():
+    """Start or stop tracing keyboard input and commands to a trace file for replay."""
+    tracing.recorder.toggle()
+
+def handle_quit():
+    """Close the program."""
+    data.states.quit = True
+
+command_handler = {
+    "add": handle_add,
+    "remove": handle_remove,
+    "dimensions": handle_dimensions,
+    "clear": handle_clear,
+    "fps": handle_fps,
+    "viewports": handle_viewports,
+    "viewport": handle_viewport,
+    "log": handle_log,
+    "perf": handle_perf,
+    "view lines": handle_view_lines,
+    "center": handle_center,
+    "plane": handle_plane,
+    "spin": handle_spin,
+    "load": handle_load,
+    "cancel": handle_cancel,
+    "save": handle_save,
+    "help": command_options,
+    "keys": actions,
+    "preset": handle_preset,
+    "backend": handle_backend,
+    "workers": handle_workers,
+    "record": handle_record,
+    "trace": handle_trace,
+    "quit": handle_quit
+}
+
+# Prompts for the arguments of each command that takes any, with the number of words each answer takes
+# ("dimensions" for one point, 0 for the rest of the line)
+prompts = {
+    "add": [("Enter the coordinates of point 1: ", "dimensions"), ("Enter the coordinates of point 2: ", "dimensions")],
+    "remove": [("Enter the coordinates of point 1: ", "dimensions"), ("Enter the coordinates of point 2: ", "dimensions")],
+    "dimensions": [("Enter the dimension: ", 1)],
+    "fps": [("Enter the target frame rate (0 for uncapped): ", 1)],
+    "viewports": [("Enter the number of rows and columns of viewports (1 1 for a single view): ", 2)],
+    "viewport": [("Enter the viewport number and 'perspective DEPTH', 'axes A B ...' or 'reset': ", 0)],
+    "view lines": [],
+    "record": [],
+    "center": [("Enter the center of the rotation plane: ", 2)],
+    "plane": [("Enter the plane of rotation: ", 2)],
+    "spin": [("Enter the plane and its speed in degrees per second (e.g. '0 3 30', 0 to stop, or 'clear'): ", 0)],
+    "load": [("Enter the file name: ", 0)],
+    "save": [("Enter the file name: ", 1)],
+    "backend": [("Enter a draw backend: ", 1)],
+    "workers": [("Enter the number of workers (1 for single-core, up to " + str(os.cpu_count()) + "): ", 1)],
+    "preset": [("Enter a preset: ", 1)]
+}
+
+def confirm_dimensions(answers):
+    """Return the question confirming a high dimension, or None if it needs no confirmation."""
+    if answers[0].isdigit() and int(answers[0]) >= 10:
+        return "    High-dimensional objects may render slowly on some machines. Are you sure you want to proceed? (y/n) "
+
+def confirm_view_lines(answers):
+    """Return the question confirming a long listing of lines, or None if it needs no confirmation."""
+    if len(data.wireframe.edges) >= 50:
+        return "    You are about to print " + str(len(data.wireframe.edges)) + " lines. Are you sure you want to proceed? (y/n) "
+
+def confirm_save(answers):
+    """Return the question confirming that a file is overwritten, or None if it needs no confirmation."""
+    file_name = answers[0] if answers[0].endswith(".wfb") or answers[0].endswith(".txt") else answers[0] + ".txt"
+    if os.path.exists("file_shapes/" + file_name):
+        return "    '" + file_name + "' already exists in folder 'file_shapes'. Are you sure you want to overwrite it? (y/n) "
+
+# Questions the console asks after a command's answers when they weren't typed, since a command run with arguments
+# takes the default answer instead of asking
+confirmations = {
+    "dimensions": confirm_dimensions,
+    "view lines": confirm_view_lines,
+    "save": confirm_save
+}
+
+def word_count(count):
+    """Return the number of words a prompt's answer takes in the current dimension."""
+    return data.states.dimensions if count == "dimensions" else count
+
+def parse_command(line):
+    """Split a command line into its command and the words after it, returning (None, words) for an unknown command."""
+    words = line.split()
+    # Two-word commands such as 'view lines' are matched before one-word ones
+    for length in (2, 1):
+        command = " ".join(words[:length]).lower()
+        if len(words) >= length and command in command_handler:
+            return command, words[length:]
+    return None, words
+
+def execute(command, args=None):
+    """Run a command, taking its answers from args (a list of words) instead of prompting when args is given."""
+    if command in prompts:
+        command_handler[command](args)
+    else:
+        command_handler[command]()
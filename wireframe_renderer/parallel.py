@@ -0,0 +1,134 @@
+"""
+Module for projecting large wireframes on several CPU cores in the N-Dimensional Wireframe Renderer.
+
+The vertex buffer, the accumulated orientation and the transformed and projected
+results live in shared memory blocks. Each frame, every worker process applies the
+orientation to its slice of the vertices and projects it to 2D in place, so only
+slice bounds and view settings are sent to the workers and nothing is copied back.
+Shapes below the size threshold, or a single worker, use the single-core path.
+"""
+
+import atexit
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import data
+import utils
+
+# Shared memory blocks attached in a worker process, by block name
+attached = {}
+
+def attach(name, shape, dtype):
+    """Return a worker's view of a shared memory block as an array, attaching the block on first use."""
+    if name not in attached:
+        # Spawned workers share the main process's resource tracker, which unlinks the block only when the main process does
+        attached[name] = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=dtype, buffer=attached[name].buf)
+
+def project_slice(names, vertex_count, dimensions, start, stop, perspective, factor):
+    """Transform and project vertices [start, stop) of the shared vertex buffer, writing the results to the shared outputs."""
+    vertices = attach(names["vertices"], (vertex_count, dimensions), float)
+    transform = attach(names["transform"], (dimensions + 1, dimensions), float)
+    world = attach(names["world"], (vertex_count, dimensions), float)
+    screen = attach(names["screen"], (vertex_count, 2), float)
+    visible = attach(names["visible"], (vertex_count,), bool)
+    world[start:stop] = vertices[start:stop] @ transform[:dimensions].T + transform[dimensions]
+    screen[start:stop], visible[start:stop] = utils.project_points(world[start:stop], perspective, factor)
+
+def release(names):
+    """Detach a worker from shared memory blocks that the main process has replaced."""
+    for name in names:
+        block = attached.pop(name, None)
+        if block is not None:
+            block.close()
+
+class ProjectionPool:
+    """Process pool that transforms and projects a shared vertex buffer in parallel slices."""
+    def __init__(self):
+        # Number of worker processes; 1 keeps everything on the main process
+        self.workers = 1
+        # Vertex buffers smaller than this are faster to project on one core than to split across processes
+        self.threshold = 100000
+        self.pool = None
+        self.pool_size = 0
+        self.blocks = {}
+        self.arrays = {}
+        self.source = None
+
+    def active(self, vertex_count):
+        """Return True if a vertex buffer of this size is projected by the worker processes."""
+        return self.workers > 1 and vertex_count >= self.threshold
+
+    def start_pool(self):
+        """Start (or restart with a new size) the worker processes."""
+        if self.pool is not None:
+            self.pool.terminate()
+        # Workers import pygame through data, which shouldn't greet the user once per process
+        os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+        # Spawned workers start from a fresh interpreter instead of forking the window, the console thread and the
+        # shared memory handles of the main process
+        self.pool = multiprocessing.get_context("spawn").Pool(self.workers)
+        self.pool_size = self.workers
+
+    def allocate(self, vertex_count, dimensions):
+        """Create the shared memory blocks for a vertex buffer of the given size, replacing the old ones."""
+        old_names = [block.name for block in self.blocks.values()]
+        self.free()
+        if self.pool is not None and old_names:
+            self.pool.map(release, [old_names] * self.pool_size)
+        shapes = {"vertices": ((vertex_count, dimensions), float),
+                  "transform": ((dimensions + 1, dimensions), float),
+                  "world": ((vertex_count, dimensions), float),
+                  "screen": ((vertex_count, 2), float),
+                  "visible": ((vertex_count,), bool)}
+        for key, (shape, dtype) in shapes.items():
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            self.blocks[key] = shared_memory.SharedMemory(create=True, size=size)
+            self.arrays[key] = np.ndarray(shape, dtype=dtype, buffer=self.blocks[key].buf)
+        self.source = None
+
+    def upload(self, vertices):
+        """Copy a vertex buffer into shared memory if it isn't the one already there."""
+        # The original geometry is never modified in place, so a new buffer always means new geometry
+        if vertices is self.source:
+            return
+        if "vertices" not in self.arrays or self.arrays["vertices"].shape != vertices.shape:
+            self.allocate(*vertices.shape)
+        self.arrays["vertices"][:] = vertices
+        self.source = vertices
+
+    def transform_project(self, vertices):
+        """Apply the orientation to a vertex buffer and project it on the worker processes, returning (world, (screen, visible))."""
+        if self.pool is None or self.pool_size != self.workers:
+            self.start_pool()
+        self.upload(vertices)
+        dimensions = vertices.shape[1]
+        self.arrays["transform"][:dimensions] = data.rotation.matrix
+        self.arrays["transform"][dimensions] = data.rotation.offset
+        names = {key: block.name for key, block in self.blocks.items()}
+        perspective = data.states.perspective
+        factor = utils.scale_factor(dimensions)
+        bounds = np.linspace(0, len(vertices), self.workers + 1).astype(int)
+        tasks = [(names, len(vertices), dimensions, bounds[i], bounds[i + 1], perspective, factor) for i in range(self.workers)]
+        self.pool.starmap(project_slice, tasks)
+        return self.arrays["world"], (self.arrays["screen"], self.arrays["visible"])
+
+    def free(self):
+        """Release the shared memory blocks."""
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+        self.source = None
+
+    def shutdown(self):
+        """Stop the worker processes and release the shared memory blocks."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        self.free()
+
+pool = ProjectionPool()
+atexit.register(pool.shutdown)
@@ -1,86 +1,49 @@
 """
 Module for generating predefined N-dimensional wireframe objects.
 
-Provides functions to create common geometric shapes such as hypercubes 
-and hyperpyramids, automatically adding their edges to the wireframe 
-for rendering in the N-Dimensional Wireframe Renderer.
+Provides functions to create common geometric shapes such as hypercubes
+and hyperpyramids. Vertices and edges are built directly as arrays from the
+binary structure of the hypercube, cached by preset name, dimension and size,
+then added to the wireframe mesh in one bulk insert, skipping edges it
+already holds, for rendering in the N-Dimensional Wireframe Renderer.
 """
 
-import render
+import numpy as np
+import cache
 import data
 
+def hypercube_mesh(dimensions, side):
+    """Return the (2^n x n) vertex array and (n*2^(n-1) x 2) edge array of a hypercube with the given half side length."""
+    indices = np.arange(2 ** dimensions)
+    # Uses binary logic to find the points of the hypercube: bit j of a vertex index decides the sign of coordinate j
+    bits = (indices[:, None] >> np.arange(dimensions)) & 1
+    vertices = np.where(bits == 1, side, -side).astype(float)
+    # Points with a single differing coordinate are connected, so each edge flips one 0 bit of its first point to 1
+    starts, flipped = np.nonzero(bits == 0)
+    edges = np.column_stack((starts, starts | (1 << flipped)))
+    return vertices, edges
+
+def hyperpyramid_mesh(dimensions, side):
+    """Return the vertex and edge arrays of a hyperpyramid with the given half side length (requires dimensions >= 3)."""
+    # Creates a hypercube in dimension - 1 as the base
+    base, edges = hypercube_mesh(dimensions - 1, side)
+    # Hardcodes the y coordinate of the base to -side length
+    vertices = np.insert(base, 1, -side, axis=1)
+    # Adds the apex point and connects every other point to it
+    apex = np.zeros((1, dimensions))
+    apex[0, 1] = side
+    vertices = np.vstack((vertices, apex))
+    apex_edges = np.column_stack((np.arange(len(base)), np.full(len(base), len(base))))
+    return vertices, np.vstack((edges, apex_edges))
+
 def hypercube(dimensions):
-    """Create a hypercube of the given dimensions and add its edges to the wireframe."""
-    points = []
-    second_points = []
-    number_of_points = 2 ** dimensions
-    for i in range(number_of_points - 1):
-        point = []
-        i += 1
-        for j in range(dimensions):
-            j = dimensions - j - 1
-            # Uses binary logic to find the points of the hypercube, subtracting the largest values first to determine the binary sequence
-            if (i - (2 ** j)) >= 0:
-                point.append(data.wireframe.side)
-                i = i - (2 ** j)
-            else:
-                point.append(-data.wireframe.side)
-        points.append(point)
-        second_points.append(point)
-    # Adds the last point manually
-    point = [-data.wireframe.side] * dimensions
-    points.append(point)
-    second_points.append(point)
-    for i in points:
-        second_points.remove(i)
-        for j in second_points:
-            different = 0
-            # Add lines between points with a single differing coordinate
-            for k in range(dimensions):
-                if i[k] != j[k]:
-                    different += 1
-            if different == 1:
-                render.add_line(i,j)
-                
+    """Create a hypercube of the given dimensions and add its edges to the wireframe, returning the number of duplicate edges skipped."""
+    return data.wireframe.add_mesh(*cache.geometry.get("hypercube", dimensions, data.wireframe.side, hypercube_mesh))
+
 def hyperpyramid(dimensions):
-    """Create a hyperpyramid of the given dimensions and add its edges to the wireframe (requires dimensions >= 3)."""
+    """Create a hyperpyramid of the given dimensions and add its edges to the wireframe (requires dimensions >= 3), returning the number of duplicate edges skipped."""
     if data.states.dimensions == 2:
         print("[NOTICE] Action terminated.")
         print("     Reason: Hyperpyramid requires dimensions >= 3.")
-        return
-    points = []
-    second_points = []
-    # Creates a hypercube in dimension - 1
-    dimensions += -1
-    number_of_points = 2 ** dimensions
-    for i in range(number_of_points - 1):
-        point = []
-        i += 1
-        for j in range(dimensions):
-            # Hardcodes the y coordinate to -side length
-            if j == 1:
-                point.append(-data.wireframe.side)
-            j = dimensions - j - 1
-            if (i - (2 ** j)) >= 0:
-                point.append(data.wireframe.side)
-                i = i - (2 ** j)
-            else:
-                point.append(-data.wireframe.side)
-        points.append(point)
-        second_points.append(point)
-    point = [-data.wireframe.side] * (dimensions + 1)
-    points.append(point)
-    second_points.append(point)
-    for i in points:
-        second_points.remove(i)
-        for j in second_points:
-            different = 0
-            for k in range(dimensions + 1):
-                if i[k] != j[k]:
-                    different += 1
-            if different == 1:
-                render.add_line(i,j)
-    # Adds the apex point and connects every other point to it
-    point = [0,data.wireframe.side] + [0] * (dimensions - 1)
-    for i in points:
-        render.add_line(i,point)
\ No newline at end of file
+        return 0
+    return data.wireframe.add_mesh(*cache.geometry.get("hyperpyramid", dimensions, data.wireframe.side, hyperpyramid_mesh))
@@ -0,0 +1,187 @@
+"""
+Module for recording animations and saving screenshots in the N-Dimensional Wireframe Renderer.
+
+While recording, every rendered frame is copied into a bounded queue that a writer
+thread drains, so encoding and disk writes never stall the render loop. Frames are
+written as a numbered PNG sequence, or collected into an animated GIF when Pillow is
+installed. When the writer can't keep up and the queue is full, frames are dropped
+and counted instead of blocking. Screenshots go through the same writer thread.
+"""
+
+import os
+import queue
+import re
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+import pygame
+import data
+
+def png_chunk(kind, body):
+    """Return a PNG chunk: its length, type, body and CRC."""
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+def write_png(file_name, pixels, size, level=6):
+    """Write RGB pixel bytes to a PNG file, compressing with zlib, which releases the GIL so the render loop keeps running."""
+    width, height = size
+    rows = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width * 3)
+    # Every scanline starts with its filter type; type 0 stores the row unchanged
+    scanlines = np.hstack((np.zeros((height, 1), dtype=np.uint8), rows)).tobytes()
+    with open(file_name, "wb") as file_pointer:
+        file_pointer.write(b"\x89PNG\r\n\x1a\n")
+        file_pointer.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        file_pointer.write(png_chunk(b"IDAT", zlib.compress(scanlines, level)))
+        file_pointer.write(png_chunk(b"IEND", b""))
+
+def next_file_name(folder, prefix, extension, reserved=()):
+    """Return a free file name 'prefix.ext', 'prefix1.ext', ... in a folder, numbered after the highest existing or reserved one."""
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+        print("[INFO] Created missing folder: '" + folder + "'.")
+    pattern = re.compile(re.escape(prefix) + r"(\d*)" + re.escape(extension) + "$")
+    numbers = []
+    for name in os.listdir(folder) + [os.path.basename(name) for name in reserved]:
+        match = pattern.match(name)
+        if match is not None:
+            numbers.append(int(match.group(1) or 0))
+    if len(numbers) == 0:
+        return os.path.join(folder, prefix + extension)
+    return os.path.join(folder, prefix + str(max(numbers) + 1) + extension)
+
+class Recorder:
+    """Captures rendered frames into a bounded queue that a writer thread saves as PNG frames or an animated GIF."""
+    def __init__(self, queue_size=64):
+        self.active = False
+        # Batch runs wait for the writer instead of dropping frames, since nobody is watching the frame rate
+        self.lossless = False
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        # Screenshots queued but not written yet, so the next one doesn't take the same name
+        self.pending = set()
+        self.reset()
+
+    def reset(self):
+        """Clear the frame counts of a recording."""
+        self.path = None
+        self.format = "png"
+        self.captured = 0
+        self.dropped = 0
+
+    def start_writer(self):
+        """Start the writer thread if it isn't running."""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.write_jobs, daemon=True)
+            self.thread.start()
+
+    def start(self, file_format="png"):
+        """Start recording every rendered frame as a PNG sequence or an animated GIF."""
+        if file_format == "gif":
+            try:
+                import PIL
+            except ImportError:
+                print("[NOTICE] GIF recording requires Pillow (pip install pillow). Recording PNG frames instead.")
+                file_format = "png"
+        self.reset()
+        self.format = file_format
+        if file_format == "gif":
+            self.path = next_file_name("recordings", "Recording", ".gif")
+        else:
+            self.path = next_file_name("recordings", "Recording", "")
+            os.makedirs(self.path)
+        self.start_writer()
+        self.active = True
+        # The frame on screen when recording starts is the first one recorded
+        data.states.dirty = True
+        print("[INFO] Recording to {" + self.path + "}.")
+
+    def stop(self):
+        """Stop recording; the writer thread finishes the queued frames and reports the result."""
+        if not self.active:
+            return
+        self.active = False
+        # The stop marker must not be dropped, so this waits for room in the queue
+        self.jobs.put(("stop", (self.path, self.format, self.captured, self.dropped)))
+
+    def toggle(self, file_format="png"):
+        """Start or stop recording."""
+        if self.active:
+            self.stop()
+        else:
+            self.start(file_format)
+
+    def capture(self, surface):
+        """Queue a copy of a rendered frame while recording, dropping it if the writer is behind."""
+        if not self.active:
+            return
+        self.captured += 1
+        job = ("frame", (self.path, self.format, pygame.image.tobytes(surface, "RGB"), surface.get_size(), time.perf_counter()))
+        try:
+            self.jobs.put(job, block=self.lossless)
+        except queue.Full:
+            self.dropped += 1
+
+    def screenshot(self, surface):
+        """Save a copy of a frame as the next free screenshot file on the writer thread."""
+        file_name = next_file_name("screenshots", "Screenshot", ".png", list(self.pending))
+        self.pending.add(file_name)
+        job = ("screenshot", (file_name, pygame.image.tobytes(surface, "RGB"), surface.get_size()))
+        self.start_writer()
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            # A screenshot is never dropped; it is saved here when the writer is busy with a recording
+            self.save(*job[1])
+            self.pending.discard(file_name)
+
+    def save(self, file_name, pixels, size):
+        """Write a screenshot's RGB pixel bytes to a PNG file."""
+        write_png(file_name, pixels, size)
+        print("[SUCCESS] Saved screenshot as {" + file_name.replace(os.sep, "/") + "}.")
+
+    def write_jobs(self):
+        """Write queued frames and screenshots until the program exits (runs on the writer thread)."""
+        frames = []
+        times = []
+        index = 0
+        while True:
+            kind, job = self.jobs.get()
+            try:
+                if kind == "screenshot":
+                    self.save(*job)
+                    self.pending.discard(job[0])
+                elif kind == "frame":
+                    # Each frame carries its recording, since a new one can start before the last is written
+                    path, file_format, pixels, size, captured_at = job
+                    if file_format == "gif":
+                        from PIL import Image
+                        # Wireframes use few colors, so an adaptive palette keeps every frame exact and small
+                        frames.append(Image.frombytes("RGB", size, pixels).convert("P", palette=Image.ADAPTIVE))
+                        times.append(captured_at)
+                    else:
+                        write_png(os.path.join(path, "frame_" + str(index).zfill(5) + ".png"), pixels, size)
+                    index += 1
+                elif kind == "stop":
+                    path, file_format, captured, dropped = job
+                    if file_format == "gif" and frames:
+                        # Each frame is shown for as long as it was on screen
+                        durations = [max(int((end - start) * 1000), 20) for start, end in zip(times, times[1:])]
+                        durations.append(durations[-1] if durations else 100)
+                        frames[0].save(path, save_all=True, append_images=frames[1:], duration=durations, loop=0)
+                    print("[SUCCESS] Recorded " + str(index) + " frames to {" + path.replace(os.sep, "/") + "}" + (" (" + str(dropped) + " of " + str(captured) + " dropped)." if dropped else "."))
+                    frames = []
+                    times = []
+                    index = 0
+            except OSError as error:
+                print("[ERROR] Frame could not be written: " + str(error))
+            finally:
+                self.jobs.task_done()
+
+    def close(self):
+        """Stop recording and wait until every queued frame and screenshot is written."""
+        self.stop()
+        if self.thread is not None and self.thread.is_alive():
+            self.jobs.join()
+
+recorder = Recorder()
@@ -1,37 +1,244 @@
 """
 Module for managing wireframe drawing and display updates in the N-Dimensional Wireframe Renderer.
 
-Provides functions to add lines to the wireframe, redraw the display, and show
+Provides functions to draw the wireframe mesh (clipped to the display, with
+pygame.draw or a NumPy rasterizer writing straight into the pixel buffer), redraw the display, and show
 an informational overlay of the current state, including dimensions, rotation,
-perspective, and other settings. Handles scaling and 2D projection for rendering
-higher-dimensional objects.
+perspective, frame-time statistics, and other settings. Handles scaling and 2D projection for rendering
+higher-dimensional objects. The projected segments and the wireframe layer drawn from them are cached
+until the geometry, orientation or projection settings change, so color and overlay changes only re-blit.
+Text surfaces are cached by text and color, and the info overlay is composed into one layer that is
+only rebuilt when one of its lines changes.
 """
 
+import os
+import math
+from collections import OrderedDict
 import pygame
+import numpy as np
 import utils
 import data
+import parallel
 
-def add_line(position_1,position_2):
-    """Add a line between two points to the wireframe and draw it on the display."""
-    data.wireframe.lines.append((position_1,position_2))
-    scale_factor = 1
-    if data.states.scale_correction:
-        # Scale correction approxamated from the projection equation to undo the scaling effects
-        scale_factor = (2 + 0.25 * data.states.perspective) ** (data.states.dimensions - 2)
-    if data.states.perspective > 0:
-        positions = utils.project_to_2d(position_1,position_2)
+class LayerCache:
+    """Keeps the screen segments of the last projection and the wireframe layer drawn from them, so view-only changes don't re-project or redraw the edges."""
+    def __init__(self):
+        self.key = None
+        self.segments = np.empty((0, 4))
+        # Edges drawn, culled and culled as sub-pixel in the cached segments
+        self.counts = (0, 0, 0)
+        self.style = None
+        self.layer = None
+
+    def projection_key(self):
+        """Return everything the projected segments depend on: the geometry and orientation versions and the projection settings."""
+        return (data.wireframe.version, data.rotation.version, data.states.dimensions, data.states.perspective,
+                data.states.scale_correction, data.display.screen.get_size(), data.display.min_segment,
+                data.display.grid, tuple(viewport.key() for viewport in data.display.viewports))
+
+    def style_key(self):
+        """Return everything the wireframe layer depends on besides the segments: the colors and the drawing backend."""
+        return (self.key, data.display.backend, data.display.screen_color, data.display.line_color, data.display.font_color, data.display.blend_strength)
+
+    def clear(self):
+        """Forget the cached segments and layer, so the next frame is projected and drawn again."""
+        self.key = None
+        self.style = None
+
+cache = LayerCache()
+
+class TextCache:
+    """LRU cache of rendered text surfaces by font, text and color, so unchanged text isn't rasterized again every frame."""
+    def __init__(self, limit=256):
+        self.limit = limit
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, color):
+        """Return the surface of a line of text in the display font, rendering it only if it isn't cached."""
+        key = (data.display.font, text, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = data.display.font.render(text,True,color)
+        self.surfaces[key] = surface
+        # Changing text, such as the frame-time statistics, would otherwise grow the cache every frame
+        if len(self.surfaces) > self.limit:
+            self.surfaces.popitem(last=False)
+        return surface
+
+text_cache = TextCache()
+
+class TextLayer:
+    """Lines of text composed onto one transparent surface, which is re-blitted as a whole until a line changes."""
+    def __init__(self):
+        self.lines = None
+        self.color = None
+        self.surface = None
+
+    def compose(self, lines, color):
+        """Return the surface of the lines of text, composing it again only if the text or color changed."""
+        if lines == self.lines and color == self.color:
+            return self.surface
+        # Lines that didn't change come from the text cache, so only the changed ones are rendered
+        surfaces = [text_cache.render(line, color) for line in lines]
+        spacing = data.display.spacing
+        width = max(surface.get_width() for surface in surfaces)
+        height = spacing * (len(surfaces) - 1) + surfaces[-1].get_height()
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        for i, surface in enumerate(surfaces):
+            self.surface.blit(surface,(0,spacing * i))
+        self.lines = lines
+        self.color = color
+        return self.surface
+
+overlay = TextLayer()
+
+def visible_segments(vertices, edges, projected=None):
+    """Return the visible screen segments of every viewport and the drawn, culled and sub-pixel counts."""
+    parts = []
+    on_screen = 0
+    for i, viewport in enumerate(data.display.viewports):
+        x, y, width, height = data.display.viewport_rect(i)
+        start = data.profiler.start()
+        points = vertices if viewport.axes is None else vertices[:, viewport.axes]
+        # The given projection is of the global view, so viewports with their own settings project again
+        shared = projected if viewport.key() == (data.states.perspective, None) else None
+        segments = utils.project_edges(points, edges, shared, viewport.depth())
+        data.profiler.stop("project", start)
+        start = data.profiler.start()
+        # Each viewport shows the whole view scaled down to fit its cell, centered in it
+        scale = min(width, height) / data.display.side
+        if scale != 1:
+            segments = segments * scale + np.tile(((width, height) - np.array(data.display.side * scale)) / 2, 2)
+        segments = utils.clip_segments(segments, width - 1, height - 1)
+        on_screen += len(segments)
+        # Segments shorter than a pixel are culled in one batch instead of each costing a draw call
+        segments = utils.cull_segments(segments, data.display.min_segment)
+        parts.append(segments + (x, y, x, y) if x or y else segments)
+        data.profiler.stop("clip", start)
+    segments = parts[0] if len(parts) == 1 else np.vstack(parts)
+    total = len(edges) * len(parts)
+    return segments, (len(segments), total - len(segments), on_screen - len(segments))
+
+def draw_grid(surface):
+    """Draw the borders between viewports."""
+    rows, columns = data.display.grid
+    width, height = surface.get_size()
+    for column in range(1, columns):
+        x = round(column * width / columns)
+        pygame.draw.line(surface, data.display.font_color, (x, 0), (x, height - 1), 1)
+    for row in range(1, rows):
+        y = round(row * height / rows)
+        pygame.draw.line(surface, data.display.font_color, (0, y), (width - 1, y), 1)
+
+def viewport_labels():
+    """Label every viewport of the grid with its number and projection."""
+    for i, viewport in enumerate(data.display.viewports):
+        x, y, width, height = data.display.viewport_rect(i)
+        text = text_cache.render(str(i + 1) + ": " + viewport.label(),data.display.font_color)
+        data.display.screen.blit(text,(x + width - text.get_width() - data.display.spacing / 2,y + data.display.spacing / 2))
+
+def draw_pygame(segments, surface):
+    """Draw screen segments with one pygame.draw.line call each."""
+    for x_one, y_one, x_two, y_two in segments.tolist():
+        pygame.draw.line(surface, data.display.line_color, (x_one, y_one), (x_two, y_two), 1)
+
+def rasterize(segments, pitch, exact=False, block=8, chunk_size=32768):
+    """Yield the flat pixel indices (y * pitch + x) covered by clipped screen segments, a bounded chunk at a time."""
+    for first in range(0, len(segments), chunk_size):
+        chunk = segments[first:first + chunk_size]
+        deltas = chunk[:, 2:] - chunk[:, :2]
+        steps = np.ceil(np.abs(deltas).max(axis=1)).astype(np.int32)
+        # Longest segments first, so the segments still being stepped are always a prefix of the chunk
+        order = np.argsort(-steps, kind="stable")
+        steps = steps[order]
+        # A 16.16 fixed-point DDA in int32; the half added to the start rounds each sample to the nearest pixel
+        starts = (np.rint(chunk[order, :2] * 65536) + 32768).astype(np.int32)
+        increments = np.rint(deltas[order] * 65536 / np.maximum(steps, 1)[:, None]).astype(np.int32)
+        offsets = np.arange(block, dtype=np.int32)
+        block_starts = np.arange(0, steps[0] + 1, block, dtype=np.int32)
+        counts = np.searchsorted(-steps, -block_starts, side="right")
+        for k, count in zip(block_starts.tolist(), counts.tolist()):
+            # Every segment long enough takes a block of samples per pass; samples past its end repeat its last pixel,
+            # unless exact, where each pixel of a segment is yielded once
+            samples = np.minimum(k + offsets, steps[:count, None])
+            x = (starts[:count, 0, None] + increments[:count, 0, None] * samples) >> 16
+            y = (starts[:count, 1, None] + increments[:count, 1, None] * samples) >> 16
+            indices = y * pitch + x
+            yield indices[k + offsets <= steps[:count, None]] if exact else indices.ravel()
+
+def pixel_buffer(surface):
+    """Return a surface's pixels as a flat writable uint32 array and its pitch in pixels, or None if it isn't 32-bit."""
+    if surface.get_bytesize() != 4:
+        return None, surface.get_width()
+    return np.frombuffer(surface.get_buffer(), dtype=np.uint32), surface.get_pitch() // 4
+
+def draw_surfarray(segments, surface):
+    """Rasterize screen segments straight into a surface's pixel buffer."""
+    if len(segments) == 0:
+        return
+    pixels, pitch = pixel_buffer(surface)
+    if pixels is None:
+        pixels = pygame.surfarray.pixels3d(surface)
+        for indices in rasterize(segments, pitch):
+            y, x = np.divmod(indices, pitch)
+            pixels[x, y] = data.display.line_color
     else:
-        # Use the x and y coordinates without projecting if in orthogonal view
-        positions = (position_1[:2],position_2[:2])
-        scale_factor = 1
-    # Don't create line if a point is outside the bounds
-    if positions is None:
+        color = surface.map_rgb(data.display.line_color)
+        for indices in rasterize(segments, pitch):
+            pixels[indices] = color
+    # The surface stays locked until the pixel array is released
+    del pixels
+
+def draw_additive(segments, surface):
+    """Rasterize screen segments into a surface's pixel buffer with additive blending, so overlapping lines become brighter."""
+    if len(segments) == 0:
         return
-    x_one = data.display.half_side + positions[0][0] * scale_factor
-    y_one = data.display.half_side - positions[0][1] * scale_factor
-    x_two = data.display.half_side + positions[1][0] * scale_factor
-    y_two = data.display.half_side - positions[1][1] * scale_factor
-    pygame.draw.line(data.display.screen, data.display.line_color, (x_one, y_one), (x_two, y_two), 1)
+    width, height = surface.get_size()
+    counts = np.zeros(width * height, dtype=np.intp)
+    pending = []
+    size = 0
+    for indices in rasterize(segments, width, exact=True):
+        pending.append(indices)
+        size += len(indices)
+        # Every count covers the whole screen, so samples are batched up to a bounded size before counting them
+        if size >= width * height:
+            counts += np.bincount(np.concatenate(pending), minlength=width * height)
+            pending = []
+            size = 0
+    if pending:
+        counts += np.bincount(np.concatenate(pending), minlength=width * height)
+    covered = np.flatnonzero(counts)
+    y, x = np.divmod(covered, width)
+    added = counts[covered, None] * np.array(data.display.line_color) * data.display.blend_strength
+    pixels = pygame.surfarray.pixels3d(surface)
+    pixels[x, y] = np.minimum(pixels[x, y] + added, 255)
+    del pixels
+
+backends = {"pygame": draw_pygame,
+            "surfarray": draw_surfarray,
+            "additive": draw_additive}
+
+def perf_info():
+    """Return the rolling frame-time statistics as lines of text."""
+    average, percentile = data.profiler.summary("frame")
+    shown_info = ["Frame: " + str(round(average, 2)) + " ms avg, " + str(round(percentile, 2)) + " ms p95"]
+    for stage in data.profiler.stages:
+        average, percentile = data.profiler.summary(stage)
+        shown_info.append(stage.capitalize() + ": " + str(round(average, 2)) + " ms avg, " + str(round(percentile, 2)) + " ms p95")
+    shown_info.append("Edges Drawn: " + str(data.profiler.edges) + ", Culled: " + str(data.profiler.culled) + " (" + str(data.profiler.subpixel) + " sub-pixel)")
+    return shown_info
+
+def spin_info():
+    """Return the spinning planes and their speeds in degrees per second as text."""
+    if len(data.rotation.velocities) == 0:
+        return "None"
+    return ", ".join("(" + str(plane[0]) + "," + str(plane[1]) + ") " + str(round(math.degrees(velocity), 1)) + " deg/s" for plane, velocity in data.rotation.velocities.items())
 
 def info():
     """Display current wireframe and state information on the screen overlay."""
@@ -39,25 +246,74 @@ def info():
                   "Perspective Depth: " + str(data.states.perspective),
                   "Rotation Plane: [" + str(min(data.rotation.plane)) + "," + str(max(data.rotation.plane)) + "]",
                   "Rotation Center: " + str(data.rotation.center),
-                  "Edges: " + str(len(data.wireframe.lines)),
+                  "Edges: " + str(len(data.wireframe.edges)),
                   "Speed Multiplier: " + str(data.rotation.speed_multiplier) + "x",
+                  "Target FPS: " + (str(data.display.target_fps) if data.display.target_fps > 0 else "Uncapped"),
                   "Scale Correction Toggle: " + str(data.states.scale_correction),
                   "Auto Rotation Toggle: " + str(data.rotation.auto_rotate),
+                  "Spinning Planes: " + spin_info(),
+                  "Viewports: " + str(data.display.grid[0]) + "x" + str(data.display.grid[1]),
+                  "Draw Backend: " + data.display.backend,
+                  "Workers: " + str(parallel.pool.workers) + (" (active)" if parallel.pool.active(len(data.wireframe.vertices)) else ""),
                   "Keep Log: " + str(data.states.log)]
+    if data.profiler.enabled:
+        shown_info += perf_info()
     y = data.display.spacing
-    for i in range(len(shown_info)):
-        text = data.display.font.render(shown_info[i],True,data.display.font_color)
-        data.display.screen.blit(text,(y,y * (i + 1)))
+    data.display.screen.blit(overlay.compose(shown_info, data.display.font_color),(y,y))
     data.states.info = True
 
+def draw_wireframe(surface):
+    """Clear a surface and draw the cached segments and the viewport borders on it."""
+    surface.fill(data.display.screen_color)
+    backends[data.display.backend](cache.segments, surface)
+    if len(data.display.viewports) > 1:
+        draw_grid(surface)
+
 def redraw():
-    """Clear the screen and redraw all lines and the info overlay if enabled."""
-    data.display.screen.fill(data.display.screen_color)
-    lines = data.wireframe.lines[:]
-    data.wireframe.lines.clear()
-    for line in lines:
-        add_line(line[0],line[1])
+    """Redraw the wireframe layer and the info overlay if enabled, projecting again only when the geometry, orientation or projection changed."""
+    key = cache.projection_key()
+    if key != cache.key:
+        # The original geometry is never modified; the accumulated orientation is applied to every vertex once per projection,
+        # and every viewport projects the same rotated vertex buffer
+        start = data.profiler.start()
+        if parallel.pool.active(len(data.wireframe.vertices)):
+            # Large shapes are transformed and projected together, in slices on the worker processes
+            vertices, projected = parallel.pool.transform_project(data.wireframe.vertices)
+        else:
+            vertices, projected = data.rotation.transform(data.wireframe.vertices), None
+        data.profiler.stop("transform", start)
+        cache.segments, cache.counts = visible_segments(vertices, data.wireframe.edges, projected)
+        cache.key = key
+        data.profiler.count(*cache.counts)
+        # New segments (every rotating frame) are drawn straight onto the screen, so animation costs no extra copy;
+        # the layer is only built once the same segments are shown again
+        start = data.profiler.start()
+        draw_wireframe(data.display.screen)
+        cache.style = None
+    else:
+        data.profiler.count(*cache.counts)
+        start = data.profiler.start()
+        if cache.style_key() != cache.style:
+            # Color and backend changes redraw the cached segments without projecting them again
+            if cache.layer is None or cache.layer.get_size() != data.display.screen.get_size():
+                cache.layer = data.display.screen.copy()
+            draw_wireframe(cache.layer)
+            cache.style = cache.style_key()
+        # Overlay and other UI-only changes just put the finished layer back under the text
+        data.display.screen.blit(cache.layer, (0, 0))
+    data.profiler.stop("draw", start)
+    start = data.profiler.start()
+    if len(data.display.viewports) > 1:
+        viewport_labels()
     if data.states.info:
         info()
-    text = data.display.font.render("Press '/' to open command panel",True,data.display.font_color)
-    data.display.screen.blit(text,(data.display.spacing,data.display.side - 2 * data.display.spacing))
\ No newline at end of file
+    # There is no console to type commands in when rendering offscreen
+    if not data.states.headless:
+        text = text_cache.render("Enter commands in the console ('help' to list them)",data.display.font_color)
+        data.display.screen.blit(text,(data.display.spacing,data.display.side - 2 * data.display.spacing))
+    if data.states.loading is not None:
+        loading = data.states.loading
+        progress = "Loading " + os.path.basename(loading.file_name) + ": " + str(int(loading.progress() * 100)) + "% (" + str(loading.lines) + " lines, C to cancel)"
+        text = text_cache.render(progress,data.display.font_color)
+        data.display.screen.blit(text,(data.display.spacing,data.display.side - 3.5 * data.display.spacing))
+    data.profiler.stop("text", start)
\ No newline at end of file
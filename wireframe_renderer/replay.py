@@ -0,0 +1,146 @@
+"""
+Module for replaying input traces in the N-Dimensional Wireframe Renderer.
+
+A trace recorded with the 'trace' command is replayed by restoring the shape and
+settings saved when tracing started, then feeding every traced frame's key presses,
+held arrow key, rotation time step and console commands to the same handlers the
+main loop uses. Replays can run offscreen and without a frame rate limit, and end
+with frame-time statistics, so a reported slowdown can be reproduced exactly and
+the same workload can be compared across builds.
+
+Example:
+    python replay.py traces/Trace.jsonl --headless --unthrottled
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pygame
+import data
+import events
+import loader
+import panel
+import recording
+
+def parse_args(argv=None):
+    """Parse the command line options for a replay."""
+    parser = argparse.ArgumentParser(description="Replay a trace of keyboard input and commands and report frame times.")
+    parser.add_argument("trace", help="trace file recorded with the 'trace' command")
+    parser.add_argument("--headless", action="store_true", help="render offscreen without opening a window")
+    parser.add_argument("--unthrottled", action="store_true", help="render as fast as possible instead of at the traced target frame rate")
+    return parser.parse_args(argv)
+
+def read_trace(file_name):
+    """Return the header and frames of a trace file, or None if it can't be read."""
+    try:
+        with open(file_name, "r") as file_pointer:
+            lines = [json.loads(line) for line in file_pointer if line.strip()]
+    except (OSError, ValueError):
+        return None
+    if len(lines) == 0 or lines[0].get("version") != 1:
+        return None
+    return lines[0], lines[1:]
+
+def restore(header, folder):
+    """Restore the shape and settings saved when tracing started, returning False if the shape can't be loaded."""
+    state = header["state"]
+    panel.set_dimensions(state["dimensions"])
+    # The shape is loaded before the orientation, which it is stored relative to
+    if not panel.load_binary_file(os.path.join(folder, header["mesh"])):
+        return False
+    data.states.perspective = state["perspective"]
+    data.states.scale_correction = state["scale_correction"]
+    data.states.info = state["info"]
+    data.states.log = state["log"]
+    data.display.current_palette = state["palette"]
+    data.display.screen_color, data.display.line_color, data.display.font_color = data.display.palettes[state["palette"]]
+    data.display.backend = state["backend"]
+    data.display.target_fps = state["target_fps"]
+    data.display.set_grid(*state["grid"])
+    for viewport, (perspective, axes) in zip(data.display.viewports, state["viewports"]):
+        viewport.perspective = perspective
+        viewport.axes = axes
+    data.rotation.plane = state["plane"]
+    data.rotation.center = state["center"]
+    data.rotation.speed_multiplier = state["speed_multiplier"]
+    data.rotation.auto_rotate = state["auto_rotate"]
+    data.rotation.velocities = {(axis_1, axis_2): velocity for axis_1, axis_2, velocity in state["velocities"]}
+    data.rotation.matrix = np.array(state["matrix"])
+    data.rotation.offset = np.array(state["offset"])
+    data.rotation.version += 1
+    if state["profiling"] != data.profiler.enabled:
+        panel.handle_perf()
+    data.states.dirty = True
+    return True
+
+def run(frames, throttled):
+    """Replay traced frames through the input handlers, returning the time each rendered frame took in seconds."""
+    times = []
+    for frame in frames:
+        start = time.perf_counter()
+        for key, ctrl in frame.get("keys", []):
+            events.handle_key(key, ctrl)
+        # Rotation runs before the console commands, in the same order as in the main loop
+        events.advance(frame["dt"], frame.get("held"))
+        for command, args in frame.get("commands", []):
+            try:
+                panel.execute(command, list(args))
+            except ValueError as error:
+                # Commands that failed when traced fail the same way here
+                print("[NOTICE] " + str(error))
+            # Loads finish before the next frame, since their progress can't be replayed frame by frame
+            loader.finish()
+        if data.states.dirty:
+            events.present()
+            times.append(time.perf_counter() - start)
+        if not data.states.headless:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    data.states.quit = True
+        if data.states.quit:
+            break
+        if throttled:
+            data.display.clock.tick(data.display.target_fps)
+    return times
+
+def report(times, elapsed, traced):
+    """Print the frame-time statistics of a replay."""
+    if len(times) == 0:
+        print("[NOTICE] The trace didn't render any frames.")
+        return
+    milliseconds = np.array(times) * 1000
+    print("[SUCCESS] Replayed " + str(len(times)) + " frames in " + str(round(elapsed, 3)) + " seconds (traced over " + str(round(traced, 3)) + " seconds).")
+    print("     Frame: " + str(round(milliseconds.mean(), 2)) + " ms avg, " + str(round(np.percentile(milliseconds, 50), 2)) + " ms p50, " + str(round(np.percentile(milliseconds, 95), 2)) + " ms p95, " + str(round(milliseconds.max(), 2)) + " ms max")
+    print("     Throughput: " + str(round(len(times) / max(milliseconds.sum() / 1000, 1e-9), 1)) + " frames/second of render time")
+
+def main(argv=None):
+    """Replay a trace and return a process exit code."""
+    args = parse_args(argv)
+    trace = read_trace(args.trace)
+    if trace is None:
+        print("[ERROR] Trace {" + args.trace + "} could not be read.")
+        return 1
+    header, frames = trace
+    if args.headless:
+        data.states.headless = True
+        data.display.initialize_headless()
+    else:
+        data.display.initialize_pygame()
+    data.display.clock = pygame.time.Clock()
+    if not restore(header, os.path.dirname(args.trace)):
+        return 1
+    recording.recorder.lossless = True
+    start = time.perf_counter()
+    times = run(frames, not args.unthrottled)
+    elapsed = time.perf_counter() - start
+    recording.recorder.close()
+    report(times, elapsed, frames[-1]["time"] if frames else 0)
+    return 0
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    finally:
+        pygame.quit()
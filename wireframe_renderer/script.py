@@ -0,0 +1,197 @@
+"""
+Module for running batch command scripts in the N-Dimensional Wireframe Renderer.
+
+A script is a text file with one command per line, written like console commands
+with all of their answers inline (for example 'dimensions 6', 'preset hypercube' or
+'plane 0 5'). Scripts can also rotate for a number of frames or degrees, change the
+view settings that are otherwise only on the keyboard, and take screenshots. Scripts
+never prompt and render without a frame rate limit, so a run is repeatable and can
+serve as a batch job or a performance scenario.
+
+Example:
+    python script.py scenario.txt --headless
+"""
+
+import argparse
+import math
+import os
+import time
+import pygame
+import data
+import events
+import loader
+import panel
+import recording
+import render
+import utils
+
+def parse_args(argv=None):
+    """Parse the command line options for a script run."""
+    parser = argparse.ArgumentParser(description="Run a file of renderer commands without prompts.")
+    parser.add_argument("script", help="file with one command per line")
+    parser.add_argument("--headless", action="store_true", help="render offscreen without opening a window")
+    return parser.parse_args(argv)
+
+def rotate(args):
+    """Rotate in the current plane for 'N frames' or 'N degrees', rendering every frame, and return the number of frames."""
+    if len(args) != 2 or args[1] not in ("frames","degrees") or not utils.valid_input(args[:1],1):
+        raise ValueError("Usage: rotate N frames|degrees")
+    amount = float(args[0])
+    step = data.rotation.theta * data.rotation.speed_multiplier
+    if args[1] == "frames":
+        frames = int(abs(amount))
+        theta = math.copysign(step, amount)
+    else:
+        # The angle is split into equal steps of at most the usual angle per frame
+        frames = math.ceil(abs(math.radians(amount)) / step)
+        theta = math.radians(amount) / max(frames, 1)
+    for _ in range(frames):
+        data.rotation.rotate(theta, data.rotation.plane, data.rotation.center)
+        draw()
+    return frames
+
+def screenshot(args):
+    """Save the current frame, as 'screenshots/NAME.png' when a name is given."""
+    draw()
+    if len(args) == 0:
+        events.handle_screenshot()
+        return
+    if not os.path.exists("screenshots"):
+        os.makedirs("screenshots")
+        print("[INFO] Created missing folder: 'screenshots'.")
+    file_name = "screenshots/" + " ".join(args) + ".png"
+    pygame.image.save(data.display.screen, file_name)
+    print("[SUCCESS] Saved screenshot as {" + file_name + "}.")
+
+def perspective(args):
+    """Set the perspective depth (0 for orthographic)."""
+    if not utils.valid_input(args,1) or float(args[0]) < 0:
+        raise ValueError("Usage: perspective DEPTH")
+    data.states.perspective = float(args[0])
+    data.states.dirty = True
+
+def palette(args):
+    """Select a color palette by index."""
+    if not utils.valid_input(args,1) or not 0 <= int(float(args[0])) < len(data.display.palettes):
+        raise ValueError("Usage: palette 0-" + str(len(data.display.palettes) - 1))
+    index = int(float(args[0]))
+    data.display.current_palette = index
+    data.display.screen_color, data.display.line_color, data.display.font_color = data.display.palettes[index]
+    data.states.dirty = True
+
+def speed(args):
+    """Set the rotation speed multiplier."""
+    if not utils.valid_input(args,1) or float(args[0]) <= 0:
+        raise ValueError("Usage: speed MULTIPLIER")
+    data.rotation.speed_multiplier = float(args[0])
+
+def toggle(name):
+    """Return a script command that sets an on/off runtime state."""
+    def set_state(args):
+        if len(args) != 1 or args[0].lower() not in ("on","off"):
+            raise ValueError("Usage: " + name.replace("_"," ") + " on|off")
+        setattr(data.states, name, args[0].lower() == "on")
+        data.states.dirty = True
+    return set_state
+
+# Commands that only exist in scripts; they take their answers as a list of words
+script_commands = {
+    "rotate": rotate,
+    "screenshot": screenshot,
+    "perspective": perspective,
+    "palette": palette,
+    "speed": speed,
+    "info": toggle("info"),
+    "scale correction": toggle("scale_correction")
+}
+
+def parse_line(line):
+    """Split a script line into its command and answer words, checking the script commands before the console ones."""
+    words = line.split()
+    for length in (2, 1):
+        command = " ".join(words[:length]).lower()
+        if len(words) >= length and command in script_commands:
+            return command, words[length:]
+    return panel.parse_command(line)
+
+def missing_words(command, args):
+    """Return the number of answer words a console command needs beyond the ones given."""
+    needed = 0
+    for _, count in panel.prompts.get(command, []):
+        needed += max(panel.word_count(count), 1)
+    return max(needed - len(args), 0)
+
+def draw():
+    """Render the current frame, showing it when there is a window."""
+    render.redraw()
+    data.states.dirty = False
+    recording.recorder.capture(data.display.screen)
+    if not data.states.headless:
+        pygame.display.flip()
+        # Keeps the window responsive; closing it stops the script
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                data.states.quit = True
+
+def run(lines):
+    """Run script lines in order, returning the number of frames rendered, or None if a line is invalid."""
+    frames = 0
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        # Don't run empty lines or comments
+        if line == "" or line.startswith("#"):
+            continue
+        command, args = parse_line(line)
+        try:
+            if command is None:
+                raise ValueError("Unknown command '" + line.split()[0] + "'.")
+            if command in script_commands:
+                frames += script_commands[command](args) or 0
+            else:
+                missing = missing_words(command, args)
+                if missing > 0:
+                    raise ValueError("'" + command + "' needs " + str(missing) + " more value" + ("s" if missing != 1 else "") + ".")
+                panel.execute(command, args)
+                # Scripts wait for background loads, so the next line sees the whole shape
+                if not loader.finish():
+                    raise ValueError("File could not be loaded.")
+        except ValueError as error:
+            print("[ERROR] Line " + str(number) + ": " + str(error))
+            return None
+        if data.states.quit:
+            break
+        if data.states.dirty and not data.states.headless:
+            draw()
+            frames += 1
+    return frames
+
+def main(argv=None):
+    """Run a command script and return a process exit code."""
+    args = parse_args(argv)
+    try:
+        with open(args.script, "r") as file_pointer:
+            lines = file_pointer.readlines()
+    except OSError:
+        print("[ERROR] Script {" + args.script + "} could not be read.")
+        return 1
+    if args.headless:
+        data.states.headless = True
+        data.display.initialize_headless()
+    else:
+        data.display.initialize_pygame()
+    recording.recorder.lossless = True
+    start = time.perf_counter()
+    frames = run(lines)
+    # Frames and screenshots still queued for the writer thread are saved before exiting
+    recording.recorder.close()
+    if frames is None:
+        return 1
+    elapsed = time.perf_counter() - start
+    print("[SUCCESS] Script {" + args.script + "} finished: " + str(frames) + " frames rendered in " + str(round(elapsed, 3)) + " seconds (" + str(round(frames / max(elapsed, 1e-9), 1)) + " frames/second).")
+    return 0
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    finally:
+        pygame.quit()
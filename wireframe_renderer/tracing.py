@@ -0,0 +1,122 @@
+"""
+Module for recording input traces in the N-Dimensional Wireframe Renderer.
+
+While tracing, every frame that has input is written as one JSON line to a trace
+file in /traces: the key presses and console commands of the frame, the arrow key
+held down, the time step used for rotation, and the time since tracing started.
+The first line holds the view settings and orientation when tracing started, and
+the shape itself is saved next to the trace as a binary wireframe (.wfb) file, so
+replay.py can start from the same state and drive the same handlers again.
+"""
+
+import json
+import os
+import time
+import binary
+import data
+import recording
+
+def snapshot():
+    """Return the view settings and orientation as a JSON-serializable dictionary."""
+    return {"dimensions": data.states.dimensions,
+            "perspective": data.states.perspective,
+            "scale_correction": data.states.scale_correction,
+            "info": data.states.info,
+            "log": data.states.log,
+            "palette": data.display.current_palette,
+            "backend": data.display.backend,
+            "target_fps": data.display.target_fps,
+            "grid": list(data.display.grid),
+            "viewports": [[viewport.perspective, viewport.axes] for viewport in data.display.viewports],
+            "plane": list(data.rotation.plane),
+            "center": list(data.rotation.center),
+            "speed_multiplier": data.rotation.speed_multiplier,
+            "auto_rotate": data.rotation.auto_rotate,
+            "velocities": [[plane[0], plane[1], velocity] for plane, velocity in data.rotation.velocities.items()],
+            "matrix": data.rotation.matrix.tolist(),
+            "offset": data.rotation.offset.tolist(),
+            "profiling": data.profiler.enabled}
+
+class TraceRecorder:
+    """Writes the input of every frame to a trace file while tracing is on."""
+    def __init__(self):
+        self.active = False
+        self.file_pointer = None
+        self.path = None
+        self.reset()
+
+    def reset(self):
+        """Clear the input gathered for the current frame."""
+        self.keys = []
+        self.commands = []
+        self.dt = 0
+        self.held = None
+
+    def start(self):
+        """Start tracing to the next free trace file, saving the current shape and settings first."""
+        self.path = recording.next_file_name("traces", "Trace", ".jsonl")
+        mesh_name = os.path.splitext(self.path)[0] + ".wfb"
+        try:
+            binary.write_shape(mesh_name, data.wireframe.vertices, data.wireframe.edges)
+            self.file_pointer = open(self.path, "w")
+            header = {"version": 1, "mesh": os.path.basename(mesh_name), "state": snapshot()}
+            self.file_pointer.write(json.dumps(header) + "\n")
+        except OSError as error:
+            print("[ERROR] Trace could not be started: " + str(error))
+            return
+        self.started = time.perf_counter()
+        self.frames = 0
+        self.reset()
+        self.active = True
+        print("[INFO] Tracing input to {" + self.path.replace(os.sep, "/") + "}.")
+
+    def stop(self):
+        """Stop tracing and close the trace file."""
+        if not self.active:
+            return
+        self.active = False
+        self.file_pointer.close()
+        self.file_pointer = None
+        print("[SUCCESS] Traced " + str(self.frames) + " frames to {" + self.path.replace(os.sep, "/") + "}. Replay it with 'python replay.py " + self.path.replace(os.sep, "/") + "'.")
+
+    def toggle(self):
+        """Start or stop tracing."""
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    def key(self, key, ctrl):
+        """Record a key press of the current frame."""
+        if self.active:
+            self.keys.append([key, ctrl])
+
+    def command(self, command, args):
+        """Record a console command of the current frame with its answers."""
+        # The trace command itself isn't replayed, or a replay would start tracing
+        if self.active and command != "trace":
+            self.commands.append([command, list(args)])
+
+    def frame(self, dt, held):
+        """Record the rotation time step and the arrow key held in the current frame."""
+        if self.active:
+            self.dt = dt
+            self.held = held
+
+    def end_frame(self):
+        """Write the current frame's input to the trace, skipping frames without any."""
+        if not self.active:
+            return
+        if self.keys or self.commands or self.dt > 0 or self.held is not None:
+            entry = {"time": round(time.perf_counter() - self.started, 6), "dt": self.dt}
+            if self.held is not None:
+                entry["held"] = self.held
+            if self.keys:
+                entry["keys"] = self.keys
+            if self.commands:
+                entry["commands"] = self.commands
+            self.file_pointer.write(json.dumps(entry) + "\n")
+            self.frames += 1
+        self.reset()
+
+recorder = TraceRecorder()
@@ -1,58 +1,120 @@
 """
 Module providing utility functions for the N-Dimensional Wireframe Renderer.
 
-Includes functions for geometric calculations, 2D projection of 
-N-dimensional points, equality checks, input validation, and file validation 
-for wireframe data.
+Includes functions for geometric calculations, batched 2D projection of 
+N-dimensional points, segment clipping and culling, and input validation.
 """
 
-import math
+import numpy as np
 import data
 
-def points_equal(p1, p2, tol=1e-6):
-    """Return True if two points are equal within a specified tolerance."""
-    return all(math.isclose(a, b, abs_tol=tol) for a, b in zip(p1, p2))
+def bound_TR(depths, perspective):
+    """Return the transformed FOV bounds for an array of depths, and a mask of the depths that are in bounds."""
+    bounds = -perspective * (depths - data.wireframe.side) + data.display.side
+    # Depths past the FOV bound are not visible, and bounds near 0 would result in a divide by 0 or near 0 error
+    in_bounds = (depths < data.wireframe.side + data.display.side / perspective) & (np.abs(bounds) >= 0.1)
+    return bounds, in_bounds
 
-def lines_equal(l1, l2, tol=1e-6):
-    """Return True if two lines (pairs of points) are equal."""
-    return ((points_equal(l1[0], l2[0], tol) and points_equal(l1[1], l2[1], tol)) or 
-            (points_equal(l1[0], l2[1], tol) and points_equal(l1[1], l2[0], tol)))
+def scale_factor(dimensions, perspective=None):
+    """Return the scale factor applied to projected coordinates to undo the scaling effects of the projection."""
+    if perspective is None:
+        perspective = data.states.perspective
+    if not data.states.scale_correction or perspective <= 0:
+        return 1
+    # Scale correction approxamated from the projection equation to undo the scaling effects
+    return (2 + 0.25 * perspective) ** (dimensions - 2)
 
-def pythag(rx,ry):
-    """Return the Euclidean distance (hypotenuse) for a right triangle with sides rx and ry."""
-    return math.sqrt(rx ** 2 + ry ** 2)
+def screen_coordinates(points, factor=None, perspective=None):
+    """Return the (V x 2) screen coordinates of points whose x and y coordinates have been projected."""
+    if factor is None:
+        factor = scale_factor(points.shape[1], perspective)
+    screen = np.empty((len(points), 2))
+    screen[:, 0] = data.display.half_side + points[:, 0] * factor
+    screen[:, 1] = data.display.half_side - points[:, 1] * factor
+    return screen
 
-def bound_TR(d):
-    """Return the transformed coordinate for perspective projection, or None if out of bounds."""
-    if d >= data.wireframe.side + data.display.side / data.states.perspective:
-        return None
-    # Equation representing the FOV bounds with a slope of perspective and centered so presets fit screen
-    return -data.states.perspective * (d - data.wireframe.side) + data.display.side
+def project_points(points, perspective=None, factor=None):
+    """Project a (V x N) array of points to 2D screen coordinates, returning the coordinates and a visibility mask."""
+    points = np.array(points, dtype=float)
+    visible = np.ones(len(points), dtype=bool)
+    # Worker processes don't share the runtime states, so they pass the view settings explicitly
+    if perspective is None:
+        perspective = data.states.perspective
+    if perspective > 0:
+        # Continuously projects down a dimension until it reaches 2D, using the last remaining coordinate as the depth
+        for depth in range(points.shape[1] - 1, 1, -1):
+            bounds, in_bounds = bound_TR(points[:, depth], perspective)
+            visible &= in_bounds
+            bounds[~in_bounds] = 1
+            # Calculates the screen coordinate position based on the screen size and FOV bound size its true coordinate position
+            points[:, :depth] *= data.display.half_side / bounds[:, None]
+    # Use the x and y coordinates without projecting if in orthogonal view
+    return screen_coordinates(points, factor, perspective), visible
 
-def project(point,scale):
-    """Project a single coordinate to 2D based on perspective and scaling, or return None if invalid."""
-    projected_point = bound_TR(float(scale))
-    if projected_point is None:
-        return None
-    elif abs(projected_point) < 0.1:
-        # Don't draw the line if it will result in a divide by 0 or near 0 error
-        return None
-    # Calculates the screen coordinate position based on the screen size and FOV bound size its true coordinate position (the last coordinate value)
-    return data.display.half_side * float(point) / float(projected_point)
+def project_segments(points_1, points_2, perspective=None):
+    """Project segments to 2D, cutting off their parts past the FOV bound."""
+    # The end points are two (S x N) arrays, and the bound is applied at every projection step
+    points_1 = np.array(points_1, dtype=float)
+    points_2 = np.array(points_2, dtype=float)
+    kept = np.ones(len(points_1), dtype=bool)
+    if perspective is None:
+        perspective = data.states.perspective
+    # bound_TR keeps the depths with a bound of at least 0.1, which are exactly the depths up to this limit
+    limit = data.wireframe.side + (data.display.side - 0.1) / perspective
+    for depth in range(points_1.shape[1] - 1, 1, -1):
+        out_1 = points_1[:, depth] > limit
+        out_2 = points_2[:, depth] > limit
+        kept &= ~(out_1 & out_2)
+        # A projection step maps straight lines to straight lines on the visible side of the bound, so cutting
+        # a segment at the bound before projecting it keeps exactly its visible part. Only segments with one end
+        # point past the bound are cut, and their end points never share a depth
+        crossing = kept & (out_1 ^ out_2)
+        start, end = points_1[crossing], points_2[crossing]
+        t = (limit - start[:, depth]) / (end[:, depth] - start[:, depth])
+        cut = start + t[:, None] * (end - start)
+        points_1[crossing & out_1] = cut[out_1[crossing]]
+        points_2[crossing & out_2] = cut[out_2[crossing]]
+        for points in (points_1, points_2):
+            bounds, _ = bound_TR(points[:, depth], perspective)
+            bounds[~kept] = 1
+            points[:, :depth] *= data.display.half_side / bounds[:, None]
+    return np.hstack((screen_coordinates(points_1, perspective=perspective), screen_coordinates(points_2, perspective=perspective)))[kept]
 
-def project_to_2d(point_1,point_2):
-    """Project two N-dimensional points to 2D coordinates for rendering, or return None if not visible."""
-    position_1, position_2 = point_1[:], point_2[:]
-    # Continuously projects down a dimension until it reaches 2D
-    while len(position_1) > 2:
-        for i in range(len(position_1) - 1):
-            position_1[i] = project(position_1[i],position_1[-1])
-            position_2[i] = project(position_2[i],position_2[-1])
-            if position_1[i] is None or position_2[i] is None:
-                return None
-        position_1.pop()
-        position_2.pop()
-    return (position_1,position_2)
+def project_edges(vertices, edges, projected=None, perspective=None):
+    """Return the edges of a vertex buffer as an (E x 4) array of screen segments."""
+    # The vertices are projected once unless their (screen, visible) projection is given
+    screen, visible = project_points(vertices, perspective) if projected is None else projected
+    # Edges with both end points in bounds use the shared vertex projection, the rest are clipped one by one
+    whole = visible[edges[:, 0]] & visible[edges[:, 1]]
+    segments = np.hstack((screen[edges[whole, 0]], screen[edges[whole, 1]]))
+    if whole.all():
+        return segments
+    crossing = edges[~whole]
+    return np.vstack((segments, project_segments(vertices[crossing[:, 0]], vertices[crossing[:, 1]], perspective)))
+
+def clip_segments(segments, x_max, y_max):
+    """Clip an (S x 4) array of screen segments to the rectangle [0, x_max] x [0, y_max], dropping the ones entirely outside it."""
+    x_one, y_one, x_two, y_two = segments.T
+    dx, dy = x_two - x_one, y_two - y_one
+    start = np.zeros(len(segments))
+    end = np.ones(len(segments))
+    inside = np.ones(len(segments), dtype=bool)
+    # Liang-Barsky: each edge of the rectangle limits the parameter range of the segment that stays inside it
+    for p, q in ((-dx, x_one), (dx, x_max - x_one), (-dy, y_one), (dy, y_max - y_one)):
+        inside &= (p != 0) | (q >= 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = q / p
+        start = np.where(p < 0, np.maximum(start, r), start)
+        end = np.where(p > 0, np.minimum(end, r), end)
+    inside &= start <= end
+    return np.column_stack((x_one + start * dx, y_one + start * dy, x_one + end * dx, y_one + end * dy))[inside]
+
+def cull_segments(segments, min_length):
+    """Drop the screen segments that span less than min_length pixels along both axes, which would cover a single pixel."""
+    if min_length <= 0:
+        return segments
+    spans = np.maximum(np.abs(segments[:, 2] - segments[:, 0]), np.abs(segments[:, 3] - segments[:, 1]))
+    return segments[spans >= min_length]
 
 def valid_input(position,length):
     """Return True if a list of coordinates has the correct length and all elements are numeric."""
@@ -65,27 +127,3 @@ def valid_input(position,length):
             return False
     else:
         return False
-
-def valid_file(file_name):
-    """Return True if a file contains valid lines for the current dimension, False otherwise, with error messages."""
-    try:
-        with open(file_name,"r") as file_pointer:
-            index = 0
-            for line in file_pointer:
-                index += 1
-                test_line = line.split()
-                if len(test_line) == 0 or test_line[0] == "#":
-                    continue
-                if len(test_line) != data.states.dimensions * 2:
-                    print("[ERROR] File is not supported for " + str(data.states.dimensions) + " dimensions.")
-                    return False
-                point_one = test_line[:data.states.dimensions]
-                point_two = test_line[data.states.dimensions:]
-                if not valid_input(point_one,data.states.dimensions) or not valid_input(point_two,data.states.dimensions):
-                    print("[ERROR] File contains unrecognized characters at line " + str(index) + ".")
-                    return False
-            return True
-    except FileNotFoundError:
-        print("[ERROR] File name not recognized.")
-        print("     Ensure that the file exists and is placed in the 'file_shapes' folder.")
-        return False
\ No newline at end of file